@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+import os, sys, json, time, random, datetime, tempfile, argparse
+import subprocess
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from PySide import QtGui
+import gui
+
+STAGES = ['trans_doc', 'diff', 'column_info_update',
+          'column_detail_update', 'detail_viewer_update', 'show_dic']
+
+def peak_memory_kb():
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def revision():
+    try:
+        path = os.path.dirname(os.path.abspath(__file__))
+        out = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                      cwd=path)
+        return out.strip()
+    except Exception:
+        return None
+
+def gen_value(rnd, depth):
+    kind = rnd.random()
+    if depth > 0 and kind < 0.2:
+        return dict(('s%d' % i, gen_value(rnd, depth-1)) for i in xrange(3))
+    if kind < 0.45:
+        return u'text-%d-中' % rnd.randint(0, 10**6)
+    if kind < 0.6:
+        return datetime.datetime(2012, 1, 1) + \
+               datetime.timedelta(seconds=rnd.randint(0, 10**7))
+    return rnd.randint(0, 10**6)
+
+def gen_doc(rnd, _id, fields, depth):
+    doc = {u'_id': _id}
+    for index in xrange(fields):
+        doc[u'f%d' % index] = gen_value(rnd, depth)
+    return doc
+
+def doc_stream(args):
+    rnd = random.Random(args.seed)
+    next_id = [0]
+    def new_doc():
+        next_id[0] += 1
+        return gen_doc(rnd, next_id[0], args.fields, args.depth)
+
+    docs = [new_doc() for x in xrange(args.window)]
+    for poll in xrange(args.polls):
+        yield [dict(doc) for doc in docs]
+
+        churn = int(len(docs) * args.churn)
+        for x in xrange(churn // 2):
+            doc = docs[rnd.randrange(len(docs))]
+            doc[u'f%d' % rnd.randrange(args.fields)] = gen_value(rnd,
+                                                                 args.depth)
+        for x in xrange(churn - churn // 2):
+            docs.pop()
+            docs.insert(0, new_doc())
+
+def convert_docs(raw):
+    # convert every field so the stage stays comparable with runs from
+    # before LazyDoc, when trans_doc copied whole documents
+    docs = [gui.LazyDoc(x) for x in raw]
+    for doc in docs:
+        doc.items()
+    return docs
+
+class Timings(object):
+    def __init__(self):
+        self.samples = dict((stage, []) for stage in STAGES)
+
+    def run(self, stage, func, *args):
+        start = time.time()
+        result = func(*args)
+        self.samples[stage].append(time.time() - start)
+        return result
+
+    def report(self):
+        report = {}
+        for stage in STAGES:
+            samples = sorted(self.samples[stage])
+            if len(samples) == 0:
+                continue
+            report[stage] = {
+                'polls': len(samples),
+                'total_ms': sum(samples) * 1000,
+                'mean_ms': sum(samples) * 1000 / len(samples),
+                'p95_ms': samples[int(len(samples) * 0.95) - 1] * 1000
+                          if len(samples) >= 20 else samples[-1] * 1000,
+                'max_ms': samples[-1] * 1000,
+                }
+        return report
+
+def run(args):
+    app = QtGui.QApplication(sys.argv)
+
+    # CollectionWindow keeps its column settings in ./gui.ini
+    os.chdir(tempfile.mkdtemp(prefix='mongodbviewer-bench-'))
+    w = gui.CollectionWindow('bench', 'bench', 'bench', None, True)
+    differ = gui.DocDiff()
+
+    timings = Timings()
+    for raw in doc_stream(args):
+        docs = timings.run('trans_doc', convert_docs, raw)
+        changes = timings.run('diff', differ.diff, docs)
+        differ.commit(changes[4])
+
+        w.new_doc, w.modify_doc, w.same_doc, w.delete_doc = changes[:4]
+        timings.run('column_info_update', w.column_info_update, docs)
+        timings.run('column_detail_update', w.column_detail_update)
+        # the window is never shown, so render the Detail tab directly
+        timings.run('detail_viewer_update', w._detail.update,
+                    w.new_doc, w.modify_doc, w.delete_doc)
+        timings.run('show_dic', gui.show_dic, docs)
+        app.processEvents()
+
+    return timings.report()
+
+def compare(report, baseline):
+    lines = []
+    for stage in STAGES:
+        if not stage in report or not stage in baseline:
+            continue
+        old = baseline[stage]['mean_ms']
+        new = report[stage]['mean_ms']
+        ratio = new / old if old else float('inf')
+        lines.append('%-22s %10.3f %10.3f %8.2fx' % (stage, old, new, ratio))
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the conversion, diff and render paths '
+                    'of gui.py on synthetic documents.')
+    parser.add_argument('--polls', type=int, default=50)
+    parser.add_argument('--window', type=int, default=50,
+                        help='documents per poll')
+    parser.add_argument('--fields', type=int, default=10,
+                        help='top level fields per document')
+    parser.add_argument('--depth', type=int, default=2,
+                        help='maximum nesting depth of sub documents')
+    parser.add_argument('--churn', type=float, default=0.1,
+                        help='fraction of documents changed per poll')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', help='write the results as json')
+    parser.add_argument('--compare', help='json file of an earlier run')
+    args = parser.parse_args()
+    if args.save:
+        args.save = os.path.abspath(args.save)
+    if args.compare:
+        args.compare = os.path.abspath(args.compare)
+
+    report = run(args)
+
+    # ru_maxrss only grows, so it is reported once for the whole run
+    peak_kb = peak_memory_kb()
+
+    print('%-22s %6s %10s %10s %10s' % ('stage', 'polls', 'mean ms',
+                                        'p95 ms', 'max ms'))
+    for stage in STAGES:
+        if not stage in report:
+            continue
+        r = report[stage]
+        print('%-22s %6d %10.3f %10.3f %10.3f' % (
+            stage, r['polls'], r['mean_ms'], r['p95_ms'], r['max_ms']))
+    print('overall peak memory: %s kb' % peak_kb)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print('')
+        print('compared with %s (%s)' % (args.compare,
+                                         baseline.get('revision')))
+        print('%-22s %10s %10s %9s' % ('stage', 'old ms', 'new ms', 'ratio'))
+        for line in compare(report, baseline['stages']):
+            print(line)
+
+    if args.save:
+        result = {'revision': revision(),
+                  'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+                  'params': vars(args),
+                  'peak_kb': peak_kb,
+                  'stages': report}
+        with open(args.save, 'w') as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+
+if __name__ == '__main__':
+    main()
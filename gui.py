@@ -5,8 +5,9 @@ import pymongo
 
 import datetime, re
 import threading, time, logging, sys
-
-GLOBAL_PAUSE = None
+import Queue, collections, contextlib, json, array
+import csv, gzip, itertools, multiprocessing
+from bson import json_util
 
 QtCore.QTextCodec.setCodecForCStrings(QtCore.QTextCodec.codecForName('utf-8'))
 
@@ -24,6 +25,102 @@ def setup_logging():
 
     logging.getLogger('').setLevel(logging.INFO)
 
+def typed_value(value, type):
+    if type is bool:
+        return value in (True, 'true', '1', 1)
+    if type is list:
+        if isinstance(value, list):
+            return value
+        return [value]
+    return type(value)
+
+class SettingsStore(QtCore.QObject):
+    # every read is served from memory, writes reach the ini file in
+    # batches once they stop coming for delay ms, and at exit
+    def __init__(self, path, delay=500, parent=None):
+        super(SettingsStore, self).__init__(parent)
+        self._settings = QtCore.QSettings(path, QtCore.QSettings.IniFormat)
+        self._values = dict((key, self._settings.value(key))
+                            for key in self._settings.allKeys())
+        self._dirty = set()
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay)
+        self._timer.timeout.connect(self.flush)
+
+        app = QtCore.QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.flush)
+
+    def value(self, key, default=None):
+        # lists are copied both ways, callers such as update_history
+        # change what they read before writing it back
+        value = self._values.get(key, default)
+        if isinstance(value, list):
+            return list(value)
+        return value
+
+    def setValue(self, key, value):
+        if isinstance(value, list):
+            value = list(value)
+        if key in self._values and self._values[key] == value:
+            return
+        self._values[key] = value
+        self._dirty.add(key)
+        self._timer.start()
+
+    def sync(self):
+        if len(self._dirty) != 0:
+            self._timer.start()
+
+    def flush(self):
+        self._timer.stop()
+        for key in self._dirty:
+            self._settings.setValue(key, self._values[key])
+        self._dirty = set()
+        self._settings.sync()
+
+class SettingsView(object):
+    def __init__(self, store, group=None):
+        self._store = store
+        self._groups = []
+        if group is not None:
+            self._groups.append(group)
+
+    def beginGroup(self, name):
+        self._groups.append(name)
+
+    def endGroup(self):
+        self._groups.pop()
+
+    def _key(self, key):
+        return '/'.join(self._groups + [key])
+
+    def value(self, key, default=None, type=None):
+        value = self._store.value(self._key(key), default)
+        if type is None or value is None:
+            return value
+        try:
+            return typed_value(value, type)
+        except (TypeError, ValueError):
+            return default
+
+    def setValue(self, key, value):
+        self._store.setValue(self._key(key), value)
+
+    def sync(self):
+        self._store.sync()
+
+_SETTINGS = None
+
+def settings_view(group=None):
+    # created on first use, gui.ini is relative to the working directory
+    global _SETTINGS
+    if _SETTINGS is None:
+        _SETTINGS = SettingsStore("gui.ini")
+    return SettingsView(_SETTINGS, group)
+
 def get_default_splitter(settings, name, splitter):
     sizes = settings.value(name, [])
     sizes = [int(x) for x in sizes]
@@ -68,45 +165,1598 @@ class CheckboxCallback(object):
     def __call__(self, checked):
         return self._callback(self._name, checked)
 
+def trans_item(item):
+    if isinstance(item, unicode):
+        return item.encode("utf-8")
+    if isinstance(item, datetime.datetime):
+        return item - datetime.timedelta(seconds=time.timezone)
+    return item
+
+def trans_value(value):
+    if isinstance(value, collections.Mapping):
+        return dict((trans_item(k), trans_value(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return [trans_value(v) for v in value]
+    return trans_item(value)
+
 def trans_doc(src):
-    dst = {}
-    def _trans_item(item):
-        if isinstance(item, unicode):
-            return item.encode("utf-8")
-        if isinstance(item, datetime.datetime):
-            return item - datetime.timedelta(seconds=time.timezone)
-        return item
-    
-    def _trans(sub_src, sub_dst):
-        for k,v in sub_src.items():
-            t_k = _trans_item(k)
-            if isinstance(v, dict):
-                sub_dst[t_k] = {}
-                _trans(v, sub_dst[t_k])
+    return trans_value(src)
+
+class LazyDoc(object):
+    # a decoded document whose values go through trans_value on first
+    # access only. The driver still decodes the whole document, what is
+    # saved is the converted copy of fields nobody looks at.
+    __slots__ = ('_source', '_keys', '_names', '_values', 'fingerprint')
+
+    def __init__(self, source):
+        self._source = source
+        self._keys = None
+        self._names = None
+        self._values = {}
+        self.fingerprint = doc_fingerprint(source)
+
+    def _name_map(self):
+        if self._names is None:
+            self._keys = []
+            self._names = {}
+            for key in self._source.keys():
+                name = trans_item(key)
+                self._keys.append(name)
+                self._names[name] = key
+        return self._names
+
+    def keys(self):
+        self._name_map()
+        return list(self._keys)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self._name_map())
+
+    def __contains__(self, name):
+        return name in self._name_map()
+
+    def __getitem__(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            pass
+        value = trans_value(self._source[self._name_map()[name]])
+        self._values[name] = value
+        return value
+
+    def get(self, name, default=None):
+        if name in self:
+            return self[name]
+        return default
+
+    def items(self):
+        return [(name, self[name]) for name in self.keys()]
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+def doc_key(_id):
+    try:
+        hash(_id)
+    except TypeError:
+        return _freeze(_id)
+    return _id
+
+def _typed_freeze(value):
+    # compared with ==, so 1, 1.0 and True or [] and {} stay apart
+    if isinstance(value, dict):
+        return dict, tuple(sorted((k, _typed_freeze(v))
+                                  for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return list, tuple(_typed_freeze(v) for v in value)
+    return type(value), _freeze(value)
+
+def doc_fingerprint(doc):
+    if isinstance(doc, LazyDoc):
+        return doc.fingerprint
+    return _typed_freeze(doc)
+
+class DocDiff(object):
+    def __init__(self):
+        self._docs = {}
+        self._prints = {}
+
+    def __len__(self):
+        return len(self._docs)
+
+    def diff(self, docs, scope=None):
+        # scope: keys the docs are expected to cover, None means all
+        new_doc = []
+        modify_doc = []
+        same_doc = []
+        delete_doc = []
+        upserts = {}
+        removals = []
+
+        last_docs = self._docs
+        last_prints = self._prints
+
+        if len(docs) != 0 and not '_id' in docs[0]:
+            state = (upserts, removals)
+            return new_doc, modify_doc, same_doc, delete_doc, state
+
+        seen = set()
+        for doc in docs:
+            key = doc_key(doc['_id'])
+            if key in seen:
+                continue
+            seen.add(key)
+            fingerprint = doc_fingerprint(doc)
+            last_print = last_prints.get(key)
+            if last_print is None:
+                new_doc.append(doc)
+            elif last_print != fingerprint:
+                modify_doc.append((doc, last_docs[key]))
             else:
-                sub_dst[t_k] = _trans_item(v)
-    _trans(src, dst)
-    return dst
-
-def show_dic(dic_lst):
+                same_doc.append(doc)
+                continue
+            upserts[key] = (doc, fingerprint)
+
+        if scope is None:
+            scope = last_docs.keys()
+        for key in scope:
+            if not key in seen and key in last_docs:
+                delete_doc.append(last_docs[key])
+                removals.append(key)
+
+        state = (upserts, removals)
+        return new_doc, modify_doc, same_doc, delete_doc, state
+
+    def known(self):
+        return self._docs
+
+    def commit(self, state):
+        upserts, removals = state
+        for key in removals:
+            del self._docs[key]
+            del self._prints[key]
+        for key, (doc, fingerprint) in upserts.items():
+            self._docs[key] = doc
+            self._prints[key] = fingerprint
+
+def untrans_item(item):
+    if isinstance(item, datetime.datetime):
+        return item + datetime.timedelta(seconds=time.timezone)
+    return item
+
+def and_criteria(criteria, extra):
+    if len(criteria) == 0:
+        return extra
+    return {'$and': [criteria, extra]}
+
+def high_water_mark(docs, field, hwm=None):
+    for doc in docs:
+        value = doc.get(field)
+        if value is None:
+            continue
+        value = untrans_item(value)
+        if hwm is None or value > hwm:
+            hwm = value
+    return hwm
+
+def trim_scope(differ, docs, field, size):
+    # keys of known documents pushed out of the newest size by docs
+    if len(docs) == 0:
+        return []
+    known = differ.known()
+    fetched = set(doc_key(doc['_id']) for doc in docs)
+    values = [(doc.get(field), key) for key, doc in known.items()
+              if not key in fetched]
+    values.extend((doc.get(field), None) for doc in docs)
+    values.sort(key=lambda value: value[0], reverse=True)
+    return [key for value, key in values[size:] if key is not None]
+
+def keyset_criteria(doc, key, order, after=True):
+    if (order == pymongo.DESCENDING) == after:
+        op = '$lt'
+    else:
+        op = '$gt'
+    _id = untrans_item(doc['_id'])
+    if key == '_id':
+        return {'_id': {op: _id}}
+    value = untrans_item(doc.get(key))
+    return {'$or': [{key: {op: value}},
+                    {key: value, '_id': {op: _id}}]}
+
+def doc_lines(dic):
     prefix = ' '*4
-    def _sub_show(dic, prefix_count, detail):
-        detail.append('{\n')
+    def _sub_show(dic, prefix_count, path, head, lines):
+        lines.append((path, head + '{\n'))
         for k,v in dic.items():
-            detail.append(prefix * prefix_count + '"%s": ' % k)
+            key = prefix * prefix_count + '"%s": ' % k
             if not isinstance(v, dict):
-                detail.append('"%s",\n' % v)
+                lines.append((path + (k,), key + '"%s",\n' % v))
             else:
-                _sub_show(v, prefix_count+1, detail)
-        detail.append(prefix*(prefix_count-1) + '}\n')
+                _sub_show(v, prefix_count+1, path + (k,), key, lines)
+        lines.append((path, prefix*(prefix_count-1) + '}\n'))
+
+    lines = []
+    _sub_show(dic, 1, (), '', lines)
+    return lines
 
+def show_dic(dic_lst):
     detail = []
     for dic in dic_lst:
-        _sub_show(dic, 1, detail)
+        detail.extend(line for path, line in doc_lines(dic))
     return ''.join(detail)
 
+def changed_paths(new, old, path=()):
+    changed = set()
+    for k, v in new.items():
+        sub_path = path + (k,)
+        if not k in old:
+            changed.add(sub_path)
+        elif isinstance(v, dict) and isinstance(old[k], dict):
+            changed.update(changed_paths(v, old[k], sub_path))
+        elif v != old[k]:
+            changed.add(sub_path)
+    return changed
+
+class JobToken(object):
+    def __init__(self):
+        self.cancelled = False
+
+class PollingEngine(QtCore.QObject):
+    # jobs run on a bounded pool of worker threads, results come back to
+    # the GUI thread through the signal. A key is never queued twice.
+    finished = QtCore.Signal(object, object, object, object)
+
+    def __init__(self, workers=4, parent=None):
+        super(PollingEngine, self).__init__(parent)
+        self._queue = Queue.Queue()
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+        self.finished.connect(self._finished)
+
+        for index in xrange(workers):
+            t = threading.Thread(target=self._run,
+                                 name='poller-%d' % index)
+            t.daemon = True
+            t.start()
+
+    def is_busy(self, key):
+        with self._lock:
+            return key in self._tokens
+
+    def submit(self, key, job, callback, errback=None):
+        with self._lock:
+            if key in self._tokens:
+                return False
+            token = self._tokens[key] = JobToken()
+        self._queue.put((key, token, job, (callback, errback)))
+        return True
+
+    def cancel(self, key):
+        with self._lock:
+            token = self._tokens.pop(key, None)
+        if token is not None:
+            token.cancelled = True
+
+    def _run(self):
+        while True:
+            key, token, job, callback = self._queue.get()
+            if token.cancelled:
+                continue
+            try:
+                result = job()
+                ok = True
+            except:
+                log.error("-"*60, exc_info=True)
+                result = sys.exc_info()[1]
+                ok = False
+            self.finished.emit(key, token, callback, (ok, result))
+
+    def _finished(self, key, token, callbacks, outcome):
+        ok, result = outcome
+        with self._lock:
+            if self._tokens.get(key) is token:
+                del self._tokens[key]
+        callback, errback = callbacks
+        if not ok:
+            callback = errback
+        if token.cancelled or callback is None:
+            return
+        try:
+            callback(result)
+        except:
+            log.error("-"*60, exc_info=True)
+
+class TaskCancelled(Exception):
+    pass
+
+class BackgroundTask(QtCore.QObject):
+    # long running work (index builds, bulk deletes, exports) gets its own
+    # thread so the polling workers stay free.
+    progress = QtCore.Signal(object)
+    done = QtCore.Signal(object, object)
+
+    def __init__(self, title, func, parent=None):
+        super(BackgroundTask, self).__init__(parent)
+        self.title = title
+        self._func = func
+        self._cancel = threading.Event()
+        self._reported = 0
+        self.started = None
+        self.running = False
+
+    def start(self):
+        self.started = time.time()
+        self.running = True
+        self.done.connect(self._done)
+        t = threading.Thread(target=self._run, name='task-%s' % self.title)
+        t.daemon = True
+        t.start()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check(self):
+        if self._cancel.is_set():
+            raise TaskCancelled()
+
+    def report(self, done, total=None, text='', force=False):
+        now = time.time()
+        if not force and now - self._reported < 0.2:
+            return
+        self._reported = now
+        self.progress.emit((done, total, text))
+
+    def _run(self):
+        try:
+            result = self._func(self)
+        except TaskCancelled:
+            self.done.emit(False, None)
+        except Exception as e:
+            log.error("-"*60, exc_info=True)
+            self.done.emit(False, e)
+        else:
+            self.done.emit(True, result)
+
+    def _done(self, ok, result):
+        self.running = False
+
+class ConnectionRegistry(object):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = {}
+        self.default_options = {}
+        self.opened = 0
+        self.reused = 0
+        self.closed = 0
+
+    def _key(self, host, options):
+        return host, tuple(sorted(options.items()))
+
+    def acquire(self, host, **options):
+        options = dict(self.default_options, **options)
+        key = self._key(host, options)
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is None:
+                client = pymongo.Connection(host, **options)
+                entry = self._clients[key] = [client, 0]
+                self.opened += 1
+            else:
+                self.reused += 1
+            entry[1] += 1
+            return entry[0]
+
+    def release(self, client):
+        with self._lock:
+            for key, entry in self._clients.items():
+                if entry[0] is not client:
+                    continue
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._clients[key]
+                    client.disconnect()
+                    self.closed += 1
+                return
+
+    def summary(self):
+        with self._lock:
+            entries = [(key[0], entry[1],
+                        getattr(entry[0], 'max_pool_size', None))
+                       for key, entry in self._clients.items()]
+        entries.sort()
+        return entries
+
+    def status(self):
+        entries = self.summary()
+        refs = sum(x[1] for x in entries)
+        text = 'conn: %s/%s refs, reused %s' % (len(entries), refs,
+                                                self.reused)
+        tips = ['%s: %s refs, pool size %s' % x for x in entries]
+        tips.append('opened %s, reused %s, closed %s' % (self.opened,
+                                                         self.reused,
+                                                         self.closed))
+        return text, '\n'.join(tips)
+
+CONNECTIONS = ConnectionRegistry()
+
+def list_database_names(conn):
+    if hasattr(conn, 'list_database_names'):
+        return conn.list_database_names()
+    try:
+        result = conn.admin.command('listDatabases', nameOnly=True)
+        return [x['name'] for x in result['databases']]
+    except pymongo.errors.OperationFailure:
+        return conn.database_names()
+
+def list_collection_names(db):
+    if hasattr(db, 'list_collection_names'):
+        return db.list_collection_names()
+    try:
+        result = db.command('listCollections', nameOnly=True)
+    except pymongo.errors.OperationFailure:
+        return db.collection_names()
+    if result['cursor']['id'] != 0:
+        return db.collection_names()
+    return [x['name'] for x in result['cursor']['firstBatch']]
+
+class NamespaceCache(QtCore.QObject):
+    databasesChanged = QtCore.Signal(object)
+    collectionsChanged = QtCore.Signal(object, object)
+
+    def __init__(self, conn, engine, ttl=5.0, parent=None):
+        super(NamespaceCache, self).__init__(parent)
+        self.conn = conn
+        self.engine = engine
+        self.ttl = ttl
+        self._names = {}
+        self._updated = {}
+        self._epoch = {}
+
+    def get(self, db_name=None):
+        return self._names.get(db_name)
+
+    def invalidate(self, db_name=None):
+        self._updated.pop(db_name, None)
+        self._epoch[db_name] = self._epoch.get(db_name, 0) + 1
+
+    def refresh(self, db_name=None):
+        if time.time() - self._updated.get(db_name, 0) <= self.ttl:
+            return
+
+        if db_name is None:
+            conn = self.conn
+            job = lambda: list_database_names(conn)
+        else:
+            db = self.conn[db_name]
+            job = lambda: list_collection_names(db)
+        epoch = self._epoch.get(db_name, 0)
+        f = lambda names: self._refreshed(db_name, epoch, names)
+        self.engine.submit(('namespaces', id(self), db_name), job, f)
+
+    def _refreshed(self, db_name, epoch, names):
+        if epoch == self._epoch.get(db_name, 0):
+            self._updated[db_name] = time.time()
+
+        names = sorted(names)
+        if self._names.get(db_name) == names:
+            return
+        self._names[db_name] = names
+
+        if db_name is None:
+            self.databasesChanged.emit(names)
+        else:
+            self.collectionsChanged.emit(db_name, names)
+
+class PollSchedule(object):
+    def __init__(self, min_interval=0.05, max_interval=10.0,
+                 backoff=2.0, idle_polls=3):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.idle_polls = idle_polls
+        self.reset()
+
+    def reset(self):
+        self.interval = self.min_interval
+        self._idle = 0
+        self._next = 0
+
+    def due(self, now):
+        return now >= self._next
+
+    def record(self, changed, now):
+        if changed:
+            self._idle = 0
+            self.interval = self.min_interval
+        else:
+            self._idle += 1
+            if self._idle >= self.idle_polls:
+                self.interval = min(self.interval * self.backoff,
+                                    self.max_interval)
+        self._next = now + self.interval
+
+class PollResult(object):
+    def __init__(self, generation, docs, changes, count=None,
+                 count_source=None, append=False, more=None, timings=None,
+                 hwm=None, head=None, tail=None):
+        self.generation = generation
+        self.hwm = hwm
+        self.head = head
+        self.tail = tail
+        self.timings = timings or {}
+        self.docs = docs
+        self.changes = changes
+        self.count = count
+        self.count_source = count_source
+        self.append = append
+        self.more = more
+
+@contextlib.contextmanager
+def measure(timings, stage):
+    start = time.time()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0) + time.time() - start
+
+def fetch_docs(cursor, timings):
+    with measure(timings, 'query'):
+        raw = list(cursor)
+    with measure(timings, 'trans_doc'):
+        return [LazyDoc(x) for x in raw]
+
+class RollingStats(object):
+    def __init__(self, size=200):
+        self.size = size
+        self._samples = {}
+
+    def add(self, stage, seconds):
+        samples = self._samples.get(stage)
+        if samples is None:
+            samples = collections.deque(maxlen=self.size)
+            self._samples[stage] = samples
+        samples.append(seconds)
+
+    def add_all(self, timings):
+        for stage, seconds in timings.items():
+            self.add(stage, seconds)
+
+    def summary(self):
+        summary = {}
+        for stage, samples in self._samples.items():
+            ordered = sorted(samples)
+            n = len(ordered)
+            summary[stage] = {
+                'count': n,
+                'p50': ordered[n//2] * 1000,
+                'p95': ordered[min(n-1, int(n*0.95))] * 1000,
+                'max': ordered[-1] * 1000,
+                }
+        return summary
+
+def _plan_stages(plan, stages, indexes):
+    if 'stage' in plan:
+        stages.append(plan['stage'])
+    if 'indexName' in plan:
+        indexes.append(plan['indexName'])
+    if 'inputStage' in plan:
+        _plan_stages(plan['inputStage'], stages, indexes)
+    for sub_plan in plan.get('inputStages', []):
+        _plan_stages(sub_plan, stages, indexes)
+    for shard in plan.get('shards', []):
+        _plan_stages(shard.get('winningPlan', {}), stages, indexes)
+
+def summarize_explain(explain):
+    if 'queryPlanner' in explain:
+        stages = []
+        indexes = []
+        _plan_stages(explain['queryPlanner']['winningPlan'], stages, indexes)
+        stats = explain.get('executionStats', {})
+        return {'plan': ' <- '.join(stages),
+                'index': ', '.join(indexes) or None,
+                'keys_examined': stats.get('totalKeysExamined'),
+                'docs_examined': stats.get('totalDocsExamined'),
+                'returned': stats.get('nReturned'),
+                'millis': stats.get('executionTimeMillis'),
+                'collscan': 'COLLSCAN' in stages}
+
+    cursor = explain.get('cursor', '')
+    index = None
+    if cursor.startswith('BtreeCursor'):
+        index = cursor.split(' ', 1)[-1]
+    return {'plan': cursor,
+            'index': index,
+            'keys_examined': explain.get('nscanned'),
+            'docs_examined': explain.get('nscannedObjects'),
+            'returned': explain.get('n'),
+            'millis': explain.get('millis'),
+            'collscan': cursor.startswith('BasicCursor')}
+
+def format_explain(summary):
+    lines = ['Winning plan: %s' % summary['plan'],
+             'Index used: %s' % (summary['index'] or 'none'),
+             'Keys examined: %s' % summary['keys_examined'],
+             'Docs examined: %s' % summary['docs_examined'],
+             'Returned: %s' % summary['returned'],
+             'Execution time: %s ms' % summary['millis']]
+    if summary['collscan']:
+        lines.append('WARNING: this query scans the whole collection')
+    return '\n'.join(lines)
+
+def format_bytes(value):
+    if value is None:
+        return '-'
+    value = float(value)
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(value) < 1024:
+            return '%.1f %s' % (value, unit)
+        value /= 1024
+    return '%.1f TB' % value
+
+def summarize_coll_stats(stats, cache_size=None):
+    return {'count': stats.get('count', 0),
+            'size': stats.get('size', 0),
+            'storage_size': stats.get('storageSize', 0),
+            'avg_obj_size': stats.get('avgObjSize', 0),
+            'index_size': stats.get('totalIndexSize', 0),
+            'index_sizes': dict(stats.get('indexSizes', {})),
+            'capped': bool(stats.get('capped')),
+            'max': stats.get('max'),
+            'max_size': stats.get('maxSize'),
+            'cache_size': cache_size}
+
+def coll_growth(summary, last, seconds):
+    if last is None or seconds <= 0:
+        return None
+    hours = seconds / 3600.0
+    return ((summary['count'] - last['count']) / hours,
+            (summary['size'] - last['size']) / hours)
+
+def format_coll_stats(summary, growth=None):
+    lines = ['Documents: %s' % summary['count'],
+             'Data size: %s' % format_bytes(summary['size']),
+             'Storage size: %s' % format_bytes(summary['storage_size']),
+             'Average object size: %s' %
+             format_bytes(summary['avg_obj_size'])]
+    if summary['capped']:
+        lines.append('Capped: yes (max %s docs, %s)' %
+                     (summary['max'] or '-',
+                      format_bytes(summary['max_size'])))
+    else:
+        lines.append('Capped: no')
+    if growth is None:
+        lines.append('Growth: measured after the next refresh')
+    else:
+        lines.append('Growth: %+.1f docs/h, %s/h' %
+                     (growth[0], format_bytes(growth[1])))
+
+    lines.append('')
+    lines.append('Index size: %s' % format_bytes(summary['index_size']))
+    cache_size = summary['cache_size']
+    if cache_size:
+        ratio = float(summary['index_size']) / cache_size
+        lines.append('Index size / cache: %.1f%%' % (ratio * 100))
+        if ratio > 1:
+            lines.append('WARNING: the indexes no longer fit in the cache')
+    for name, size in sorted(summary['index_sizes'].items()):
+        lines.append('  %s: %s' % (name, format_bytes(size)))
+    return '\n'.join(lines)
+
+def eval_filter(exp):
+    if len(exp) == 0:
+        return {}
+    if not exp.startswith("{"):
+        exp = '{%s}' % exp
+    try:
+        criteria = eval(exp)
+    except:
+        return None
+    if not isinstance(criteria, dict):
+        return None
+    return criteria
+
+EQUALITY_OPERATORS = set(['$eq', '$in'])
+PATTERN_TYPE = type(re.compile(''))
+
+def query_fields(criteria):
+    equality = []
+    ranges = []
+    for field, value in criteria.items():
+        if field == '$and':
+            for sub in value:
+                fields = query_fields(sub)
+                if fields is None:
+                    return None
+                equality.extend(fields[0])
+                ranges.extend(fields[1])
+            continue
+        if field.startswith('$'):
+            return None
+        if isinstance(value, dict) and \
+               any(k.startswith('$') for k in value):
+            if set(value) <= EQUALITY_OPERATORS:
+                equality.append(field)
+            else:
+                ranges.append(field)
+        elif isinstance(value, PATTERN_TYPE):
+            ranges.append(field)
+        else:
+            equality.append(field)
+    equality = sorted(set(equality))
+    ranges = sorted(set(ranges) - set(equality))
+    return equality, ranges
+
+def esr_index(equality, sort, ranges):
+    keys = [(field, 1) for field in equality]
+    seen = set(equality)
+    for field, direction in sort:
+        if not field in seen:
+            keys.append((field, direction))
+            seen.add(field)
+    for field in ranges:
+        if not field in seen:
+            keys.append((field, 1))
+            seen.add(field)
+    return keys
+
+def _reversed_keys(keys):
+    if not all(isinstance(d, (int, long, float)) for f, d in keys):
+        return None
+    return [(f, -d) for f, d in keys]
+
+def index_support(keys, equality, sort, ranges):
+    keys = list(keys)
+    fields = [f for f, d in keys]
+    usable = set(equality) | set(ranges) | set(f for f, d in sort[:1])
+    if len(fields) == 0 or not fields[0] in usable:
+        return None
+
+    pos = 0
+    while pos < len(fields) and fields[pos] in equality:
+        pos += 1
+    if pos != len(equality):
+        return 'partial'
+
+    sort = [(f, d) for f, d in sort if not f in equality]
+    if len(sort) != 0:
+        part = keys[pos:pos+len(sort)]
+        if part != sort and part != _reversed_keys(sort):
+            return 'partial'
+        pos += len(sort)
+
+    if not set(ranges) <= set(fields[pos:]):
+        return 'partial'
+    return 'esr'
+
+def redundant_indexes(index_info):
+    result = []
+    for name, info in sorted(index_info.items()):
+        if name == '_id_' or info.get('unique') or info.get('sparse') or \
+               'partialFilterExpression' in info or \
+               'expireAfterSeconds' in info:
+            continue
+        keys = list(info['key'])
+        for other, other_info in sorted(index_info.items()):
+            other_keys = list(other_info['key'])
+            if other == name or len(other_keys) < len(keys):
+                continue
+            if len(other_keys) == len(keys) and other > name:
+                continue
+            prefix = other_keys[:len(keys)]
+            if prefix == keys or prefix == _reversed_keys(keys):
+                result.append((name, other))
+                break
+    return result
+
+def format_index_keys(keys):
+    return ', '.join('(%r, %s)' % (str(f), d) for f, d in keys)
+
+def index_name(keys):
+    return '_'.join('%s_%s' % (field, direction) for field, direction in keys)
+
+def index_builds(inprog, ns):
+    db_name = ns.split('.', 1)[0]
+    builds = []
+    for op in inprog:
+        command = op.get('command') or op.get('query') or \
+                  op.get('insert') or {}
+        msg = op.get('msg') or ''
+        if 'createIndexes' in command:
+            if '%s.%s' % (db_name, command['createIndexes']) != ns:
+                continue
+            names = [index.get('name') for index in command.get('indexes', [])]
+        elif op.get('ns') == ns and msg.startswith('Index Build'):
+            names = []
+        elif command.get('ns') == ns and 'key' in command:
+            names = [command.get('name')]
+        else:
+            continue
+        progress = op.get('progress') or {}
+        builds.append({'opid': op.get('opid'), 'names': names, 'msg': msg,
+                       'done': progress.get('done'),
+                       'total': progress.get('total')})
+    return builds
+
+def kill_op(conn, opid):
+    try:
+        conn.admin.command('killOp', op=opid)
+    except pymongo.errors.OperationFailure:
+        conn.admin['$cmd.sys.killop'].find_one({'op': opid})
+
+def collection_task(host, db_name, coll_name, func):
+    # the task holds its own reference, so a Disconnect while it runs
+    # does not close the client under it
+    def run(task):
+        conn = CONNECTIONS.acquire(host)
+        try:
+            return func(task, conn[db_name][coll_name])
+        finally:
+            CONNECTIONS.release(conn)
+    return run
+
+def build_index(task, host, db_name, coll_name, keys, name, background):
+    conn = CONNECTIONS.acquire(host)
+    try:
+        coll = conn[db_name][coll_name]
+        result = {}
+        def build():
+            try:
+                result['name'] = coll.create_index(keys, name=name,
+                                                   background=background)
+            except Exception as e:
+                result['error'] = e
+        t = threading.Thread(target=build, name='index-%s' % name)
+        t.daemon = True
+        t.start()
+
+        killed = False
+        while t.is_alive():
+            t.join(1)
+            try:
+                inprog = coll.database.current_op().get('inprog', [])
+            except:
+                continue
+            for op in index_builds(inprog, coll.full_name):
+                if op['names'] and not name in op['names']:
+                    continue
+                task.report(op['done'] or 0, op['total'], op['msg'])
+                # an op without index names may be another client's build
+                if task.cancelled() and not killed and name in op['names']:
+                    kill_op(conn, op['opid'])
+                    killed = True
+
+        if killed:
+            raise TaskCancelled()
+        if 'error' in result:
+            raise result['error']
+        if task.cancelled():
+            return '%s, the build could not be cancelled' % result['name']
+        return result['name']
+    finally:
+        CONNECTIONS.release(conn)
+
+CLEAR_MODES = [('batched', 'Delete all documents in _id batches'),
+               ('filter', 'Delete the documents matching the filter'),
+               ('drop', 'Drop and recreate, keeping the indexes')]
+
+def delete_batches(task, coll, criteria, batch_size, pause):
+    total = coll.find(criteria).count()
+    removed = 0
+    last = None
+    progressed = False
+    while True:
+        task.check()
+        query = criteria
+        if last is not None:
+            query = and_criteria(criteria, {'_id': {'$gt': last}})
+        cursor = coll.find(query, {'_id': 1}).sort('_id', pymongo.ASCENDING)
+        ids = [doc['_id'] for doc in cursor.limit(batch_size)]
+        if len(ids) == 0:
+            if last is None or not progressed:
+                return removed
+            # $gt stops at the last _id of one bson type, start over for
+            # the _ids of the other types
+            last = None
+            progressed = False
+            continue
+
+        # a range only matches within one bson type
+        if type(ids[0]) is type(ids[-1]):
+            selector = {'_id': {'$gte': ids[0], '$lte': ids[-1]}}
+        else:
+            selector = {'_id': {'$in': ids}}
+        result = coll.remove(and_criteria(criteria, selector))
+        if isinstance(result, dict):
+            count = result.get('n', len(ids))
+        else:
+            count = len(ids)
+        removed += count
+        progressed = progressed or count != 0
+        last = ids[-1]
+
+        task.report(removed, total)
+        if pause > 0:
+            time.sleep(pause)
+
+def drop_and_recreate(task, coll):
+    options = coll.options()
+    indexes = coll.index_information()
+    task.check()
+
+    coll.drop()
+    if len(options) != 0:
+        coll.database.create_collection(coll.name, **options)
+    created = 0
+    for name, info in indexes.items():
+        if name == '_id_':
+            continue
+        info = dict(info)
+        keys = info.pop('key')
+        info.pop('v', None)
+        info.pop('ns', None)
+        coll.create_index(keys, name=name, **info)
+        created += 1
+        task.report(created, len(indexes) - 1, force=True)
+    return 'recreated %d indexes' % created
+
+EXPORT_FILTERS = ('JSON lines (*.jsonl);;CSV (*.csv);;'
+                  'gzip JSON lines (*.jsonl.gz);;gzip CSV (*.csv.gz)')
+
+def export_pages(task, coll, criteria, projection, size=500, target=0.5):
+    # pages walk _id, the order of an export does not matter and $gt on
+    # any other column would stop at nulls and type changes
+    after = None
+    while True:
+        task.check()
+        query = criteria
+        if after is not None:
+            query = and_criteria(criteria, after)
+        start = time.time()
+        cursor = coll.find(query, projection)
+        docs = list(cursor.sort('_id', pymongo.ASCENDING).limit(size))
+        elapsed = time.time() - start
+        if len(docs) != 0:
+            yield docs
+        if len(docs) < size:
+            return
+        after = {'_id': {'$gt': docs[-1]['_id']}}
+
+        # aim at about target seconds per page
+        if elapsed < target / 2:
+            size = min(size * 2, 20000)
+        elif elapsed > target:
+            size = max(size // 2, 100)
+
+def jsonl_lines(docs):
+    for doc in docs:
+        yield json_util.dumps(doc) + '\n'
+
+def csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    if isinstance(value, (dict, list)):
+        return json_util.dumps(value)
+    return str(value)
+
+def csv_rows(docs, headers):
+    for doc in docs:
+        yield [csv_value(doc.get(name)) for name in headers]
+
+def export_docs(task, pages, path, headers=None, total=None):
+    opener = open
+    if path.endswith('.gz'):
+        opener = gzip.open
+    count = 0
+    with contextlib.closing(opener(path, 'wb')) as f:
+        if headers is not None:
+            writer = csv.writer(f)
+            writer.writerow([csv_value(name) for name in headers])
+        for docs in pages:
+            if headers is not None:
+                writer.writerows(csv_rows(docs, headers))
+            else:
+                f.writelines(jsonl_lines(docs))
+            count += len(docs)
+            task.report(count, total)
+    return '%d documents written to %s' % (count, path)
+
+IMPORT_FILTERS = ('JSON lines / mongoexport (*.jsonl *.json *.gz);;'
+                  'CSV (*.csv *.csv.gz);;All files (*)')
+
+def csv_cell(text):
+    for convert in (int, float):
+        try:
+            return convert(text)
+        except ValueError:
+            pass
+    return text.decode('utf-8')
+
+def csv_doc(headers, row):
+    doc = {}
+    for name, text in zip(headers, row):
+        path = name.split('.')
+        sub = doc
+        for key in path[:-1]:
+            sub = sub.setdefault(key, {})
+        sub[path[-1]] = csv_cell(text)
+    return doc
+
+def parse_chunk(chunk):
+    kind, headers, items = chunk
+    if kind == 'docs':
+        return items, 0
+    docs = []
+    errors = 0
+    for item in items:
+        if kind == 'json' and not item.strip():
+            continue
+        try:
+            if kind == 'csv':
+                doc = csv_doc(headers, item)
+            else:
+                doc = json_util.loads(item)
+        except Exception:
+            errors += 1
+            continue
+        if not isinstance(doc, dict):
+            errors += 1
+            continue
+        docs.append(doc)
+    return docs, errors
+
+def _chunked(iterable, size):
+    iterable = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterable, size))
+        if len(chunk) == 0:
+            return
+        yield chunk
+
+def import_chunks(f, path, size):
+    if path.endswith('.csv') or path.endswith('.csv.gz'):
+        reader = csv.reader(f)
+        headers = [name.decode('utf-8') for name in next(reader)]
+        for rows in _chunked(reader, size):
+            yield 'csv', headers, rows
+        return
+
+    lines = iter(f)
+    first = next(lines, '')
+    if first.lstrip().startswith('['):
+        # mongoexport --jsonArray can only be read as a whole
+        docs = json_util.loads(first + ''.join(lines))
+        for chunk in _chunked(docs, size):
+            yield 'docs', None, chunk
+        return
+    for chunk in _chunked(itertools.chain([first], lines), size):
+        yield 'json', None, chunk
+
+def insert_batch(coll, docs, ordered):
+    if ordered:
+        bulk = coll.initialize_ordered_bulk_op()
+    else:
+        bulk = coll.initialize_unordered_bulk_op()
+    for doc in docs:
+        bulk.insert(doc)
+    try:
+        result = bulk.execute()
+    except pymongo.errors.BulkWriteError as e:
+        result = e.details
+    return result['nInserted'], len(result['writeErrors'])
+
+def import_docs(task, coll, path, ordered, batch_size, workers):
+    opener = open
+    if path.endswith('.gz'):
+        opener = gzip.open
+
+    counts = {'inserted': 0, 'parse': 0, 'insert': 0}
+    def write(result):
+        docs, errors = result
+        counts['parse'] += errors
+        if len(docs) != 0:
+            inserted, errors = insert_batch(coll, docs, ordered)
+            counts['inserted'] += inserted
+            counts['insert'] += errors
+        task.report(counts['inserted'], None,
+                    'parse errors: %(parse)d, insert errors: %(insert)d' %
+                    counts)
+        if ordered and counts['insert'] != 0:
+            raise pymongo.errors.OperationFailure(
+                'ordered import stopped at the first error after %d '
+                'documents' % counts['inserted'])
+
+    # parsing runs ahead of the inserts by at most two chunks per worker
+    pool = multiprocessing.Pool(workers)
+    pending = collections.deque()
+    try:
+        with contextlib.closing(opener(path, 'rb')) as f:
+            for chunk in import_chunks(f, path, batch_size):
+                task.check()
+                pending.append(pool.apply_async(parse_chunk, (chunk,)))
+                if len(pending) >= workers * 2:
+                    write(pending.popleft().get())
+        while len(pending) != 0:
+            task.check()
+            write(pending.popleft().get())
+    finally:
+        pool.terminate()
+    return ('%(inserted)d inserted, %(parse)d parse errors, '
+            '%(insert)d insert errors' % counts)
+
+def profile_query(entry):
+    command = entry.get('command')
+    if not isinstance(command, dict) or not 'find' in command:
+        command = entry.get('query')
+    if not isinstance(command, dict):
+        return None
+    if 'find' in command:
+        return command.get('filter') or {}, list((command.get('sort') or
+                                                  {}).items())
+    if entry.get('op') != 'query':
+        return None
+    for query, orderby in (('$query', '$orderby'), ('query', 'orderby')):
+        if query in command:
+            return command[query], list(command.get(orderby, {}).items())
+    return command, []
+
+def advise_indexes(queries, index_info):
+    lines = []
+    seen = set()
+    for label, criteria, sort in queries:
+        fields = query_fields(criteria)
+        if fields is None:
+            lines.append('SKIPPED %s: $or/$where style queries are not '
+                         'analysed' % label)
+            continue
+        equality, ranges = fields
+        sort = [(f, int(d) if isinstance(d, (int, long, float)) else d)
+                for f, d in sort if not f.startswith('$')]
+        shape = (tuple(equality), tuple(sort), tuple(ranges))
+        if shape in seen or shape == ((), (), ()):
+            continue
+        seen.add(shape)
+
+        support = {}
+        for name, info in index_info.items():
+            level = index_support(info['key'], equality, sort, ranges)
+            if level is not None:
+                support.setdefault(level, []).append(name)
+
+        suggestion = format_index_keys(esr_index(equality, sort, ranges))
+        if 'esr' in support:
+            lines.append('OK %s: served by %s' %
+                         (label, ', '.join(sorted(support['esr']))))
+        elif 'partial' in support:
+            lines.append('PARTIAL %s: %s used out of ESR order, suggest %s' %
+                         (label, ', '.join(sorted(support['partial'])),
+                          suggestion))
+        else:
+            lines.append('NOT COVERED %s: suggest %s' % (label, suggestion))
+
+    for name, other in redundant_indexes(index_info):
+        lines.append('REDUNDANT %s: prefix of %s' % (name, other))
+    if len(lines) == 0:
+        lines.append('Nothing to advise')
+    return '\n'.join(lines)
+
+PROFILE_VOLATILE_KEYS = set(['lsid', '$clusterTime', '$db', '$readPreference',
+                             'cursor', 'batchSize', 'comment', 'shardVersion'])
+
+def query_shape(value):
+    if isinstance(value, dict):
+        return dict((k, query_shape(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        if any(isinstance(x, dict) for x in value):
+            return [query_shape(x) for x in value]
+        return ['?']
+    return '?'
+
+def profile_shape(entry):
+    op = entry.get('op')
+    query = entry.get('query')
+    if op == 'command' or not isinstance(query, dict):
+        query = entry.get('command') or {}
+    query = dict((k, v) for k, v in query.items()
+                 if not k in PROFILE_VOLATILE_KEYS)
+    return (entry.get('ns'), op,
+            json.dumps(query_shape(query), sort_keys=True))
+
+class ProfileStats(object):
+    def __init__(self, size=200):
+        self.size = size
+        self.shapes = {}
+
+    def add(self, entry):
+        key = profile_shape(entry)
+        stats = self.shapes.get(key)
+        if stats is None:
+            stats = self.shapes[key] = {
+                'count': 0, 'total': 0, 'docs': 0,
+                'millis': collections.deque(maxlen=self.size)}
+        millis = entry.get('millis', 0)
+        stats['count'] += 1
+        stats['total'] += millis
+        stats['millis'].append(millis)
+        stats['docs'] += entry.get('docsExamined',
+                                   entry.get('nscannedObjects', 0))
+        return key
+
+    def row(self, key):
+        stats = self.shapes[key]
+        ordered = sorted(stats['millis'])
+        p95 = ordered[min(len(ordered)-1, int(len(ordered)*0.95))]
+        return key + (stats['count'], stats['total'], p95, stats['docs'])
+
+class RingBuffer(object):
+    def __init__(self, size):
+        self.size = size
+        self._data = array.array('d', [0.0] * size)
+        self._next = 0
+        self.count = 0
+
+    def append(self, value):
+        self._data[self._next] = value
+        self._next = (self._next + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+
+    def values(self):
+        if self.count < self.size:
+            return self._data[:self.count].tolist()
+        return (self._data[self._next:] + self._data[:self._next]).tolist()
+
+    def last(self):
+        if self.count == 0:
+            return None
+        return self._data[self._next - 1]
+
+MB = 1024.0 * 1024
+
+SERVER_METRICS = [
+    ('insert/s', ('opcounters', 'insert'), 'rate', 1),
+    ('query/s', ('opcounters', 'query'), 'rate', 1),
+    ('update/s', ('opcounters', 'update'), 'rate', 1),
+    ('delete/s', ('opcounters', 'delete'), 'rate', 1),
+    ('getmore/s', ('opcounters', 'getmore'), 'rate', 1),
+    ('command/s', ('opcounters', 'command'), 'rate', 1),
+    ('net in KB/s', ('network', 'bytesIn'), 'rate', 1024.0),
+    ('net out KB/s', ('network', 'bytesOut'), 'rate', 1024.0),
+    ('connections', ('connections', 'current'), 'gauge', 1),
+    ('cache MB', ('wiredTiger', 'cache',
+                  'bytes currently in the cache'), 'gauge', MB),
+    ('cache dirty MB', ('wiredTiger', 'cache',
+                        'tracked dirty bytes in the cache'), 'gauge', MB),
+    ('queued readers', ('globalLock', 'currentQueue', 'readers'), 'gauge', 1),
+    ('queued writers', ('globalLock', 'currentQueue', 'writers'), 'gauge', 1),
+    ('active clients', ('globalLock', 'activeClients', 'total'), 'gauge', 1),
+    ]
+
+def _status_value(status, path):
+    for key in path:
+        if not isinstance(status, dict) or not key in status:
+            return None
+        status = status[key]
+    return status
+
+class ServerStatusSeries(object):
+    def __init__(self, size=600):
+        self.series = dict((name, RingBuffer(size))
+                           for name, path, kind, scale in SERVER_METRICS)
+        self._last = None
+
+    def add(self, status, now):
+        if 'uptimeMillis' in status:
+            now = status['uptimeMillis'] / 1000.0
+
+        values = {}
+        for name, path, kind, scale in SERVER_METRICS:
+            value = _status_value(status, path)
+            if value is not None:
+                values[name] = float(value)
+
+        last = self._last
+        self._last = (now, values)
+        for name, path, kind, scale in SERVER_METRICS:
+            if not name in values:
+                continue
+            if kind == 'gauge':
+                self.series[name].append(values[name] / scale)
+                continue
+            if last is None or not name in last[1] or now <= last[0]:
+                continue
+            delta = values[name] - last[1][name]
+            if delta < 0:
+                continue
+            self.series[name].append(delta / (now - last[0]) / scale)
+
+COUNT_MODES = [('exact', 'Exact'),
+               ('estimate', 'Estimate'),
+               ('cached', 'Cached'),
+               ('manual', 'On request')]
+
+def count_documents(coll, criteria, source):
+    if source == 'estimate':
+        if hasattr(coll, 'estimated_document_count'):
+            return coll.estimated_document_count()
+        return coll.database.command('collstats', coll.name)['count']
+    if hasattr(coll, 'count_documents'):
+        return coll.count_documents(criteria)
+    return coll.find(criteria).count()
+
+def _row_ranges(rows):
+    ranges = []
+    for row in rows:
+        if ranges and ranges[-1][1] == row - 1:
+            ranges[-1][1] = row
+        else:
+            ranges.append([row, row])
+    return ranges
+
+class DocTableModel(QtCore.QAbstractTableModel):
+    moreRequested = QtCore.Signal()
+
+    def __init__(self, parent=None):
+        super(DocTableModel, self).__init__(parent)
+        self.headers = [None]
+        self._keys = []
+        self._docs = {}
+        self._rows = {}
+        self.more = False
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._keys)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.headers)
+
+    def _format(self, doc, name):
+        return str(doc.get(name, '')) + '\n'
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid() or role != QtCore.Qt.DisplayRole:
+            return None
+        column = index.column()
+        if column == 0:
+            return None
+        doc = self._docs[self._keys[index.row()]]
+        return self._format(doc, self.headers[column])
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if orientation == QtCore.Qt.Horizontal and \
+           role == QtCore.Qt.DisplayRole and \
+           0 < section < len(self.headers):
+            return self.headers[section]
+        return None
+
+    def canFetchMore(self, parent=QtCore.QModelIndex()):
+        return not parent.isValid() and self.more
+
+    def fetchMore(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return
+        self.moreRequested.emit()
+
+    def key(self, row):
+        return self._keys[row]
+
+    def doc(self, row):
+        return self._docs[self._keys[row]]
+
+    def row_of(self, key):
+        if self._rows is None:
+            self._rows = dict((k, row) for row, k in enumerate(self._keys))
+        return self._rows.get(key)
+
+    def append_column(self, name):
+        index = len(self.headers)
+        self.beginInsertColumns(QtCore.QModelIndex(), index, index)
+        self.headers.append(name)
+        self.endInsertColumns()
+        return index
+
+    def clear(self):
+        self.beginResetModel()
+        del self.headers[1:]
+        self._keys = []
+        self._docs = {}
+        self._rows = {}
+        self.more = False
+        self.endResetModel()
+
+    def clear_rows(self):
+        self.beginResetModel()
+        self._keys = []
+        self._docs = {}
+        self._rows = {}
+        self.more = False
+        self.endResetModel()
+
+    def apply_changes(self, new_doc, modify_doc, delete_doc, append=False):
+        root = QtCore.QModelIndex()
+
+        rows = []
+        for doc in delete_doc:
+            row = self.row_of(doc_key(doc['_id']))
+            if row is not None:
+                rows.append(row)
+        rows.sort()
+        for first, last in reversed(_row_ranges(rows)):
+            self.beginRemoveRows(root, first, last)
+            for key in self._keys[first:last+1]:
+                del self._docs[key]
+            del self._keys[first:last+1]
+            self._rows = None
+            self.endRemoveRows()
+
+        rows = []
+        for new, old in modify_doc:
+            key = doc_key(new['_id'])
+            row = self.row_of(key)
+            if row is None:
+                continue
+            self._docs[key] = new
+            rows.append(row)
+        rows.sort()
+        last_column = len(self.headers) - 1
+        for first, last in _row_ranges(rows):
+            self.dataChanged.emit(self.index(first, 1),
+                                  self.index(last, last_column))
+
+        keys = []
+        for doc in new_doc:
+            key = doc_key(doc['_id'])
+            if key in self._docs:
+                continue
+            self._docs[key] = doc
+            keys.append(key)
+        if len(keys) == 0:
+            return
+        if append:
+            first = len(self._keys)
+            self.beginInsertRows(root, first, first + len(keys) - 1)
+            self._keys.extend(keys)
+            if self._rows is not None:
+                for row, key in enumerate(keys):
+                    self._rows[key] = first + row
+            self.endInsertRows()
+        else:
+            self.beginInsertRows(root, 0, len(keys) - 1)
+            self._keys[0:0] = keys
+            self._rows = None
+            self.endInsertRows()
+
+    def sort(self, column, order=QtCore.Qt.AscendingOrder):
+        if column <= 0 or column >= len(self.headers):
+            return
+        name = self.headers[column]
+
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        keys = [self._keys[index.row()] for index in persistent]
+
+        docs = self._docs
+        self._keys.sort(key=lambda k: self._format(docs[k], name),
+                        reverse=(order == QtCore.Qt.DescendingOrder))
+        self._rows = None
+
+        self.changePersistentIndexList(persistent,
+                                       [self.index(self.row_of(k),
+                                                   index.column())
+                                        for k, index in zip(keys, persistent)])
+        self.layoutChanged.emit()
+
+class DocDetailView(object):
+    def __init__(self, viewer):
+        self.viewer = viewer
+        self._frames = {}
+        self._lines = {}
+        self._highlighted = set()
+
+        self._plain = QtGui.QTextCharFormat()
+        self._plain.setFontWeight(QtGui.QFont.Normal)
+        self._bold = QtGui.QTextCharFormat()
+        self._bold.setFontWeight(QtGui.QFont.Bold)
+
+    def clear(self):
+        self.viewer.clear()
+        self._frames = {}
+        self._lines = {}
+        self._highlighted = set()
+
+    def _write(self, cursor, key, changed):
+        lines = self._lines[key]
+        run = []
+        run_bold = False
+        for path, line in lines:
+            bold = False
+            for index in xrange(len(path) + 1):
+                if path[:index] in changed:
+                    bold = True
+                    break
+            if bold != run_bold and len(run) != 0:
+                cursor.insertText(''.join(run),
+                                  self._bold if run_bold else self._plain)
+                run = []
+            run_bold = bold
+            run.append(line)
+        text = ''.join(run)
+        if text.endswith('\n'):
+            text = text[:-1]
+        cursor.insertText(text, self._bold if run_bold else self._plain)
+
+    def _replace(self, key, changed):
+        frame = self._frames[key]
+        cursor = frame.firstCursorPosition()
+        cursor.setPosition(frame.lastPosition(),
+                           QtGui.QTextCursor.KeepAnchor)
+        cursor.removeSelectedText()
+        self._write(cursor, key, changed)
+
+    def _remove(self, key):
+        frame = self._frames.pop(key)
+        del self._lines[key]
+        cursor = QtGui.QTextCursor(self.viewer.document())
+        cursor.setPosition(frame.firstPosition() - 1)
+        cursor.setPosition(frame.lastPosition() + 1,
+                           QtGui.QTextCursor.KeepAnchor)
+        cursor.removeSelectedText()
+
+    def update(self, new_doc, modify_doc, delete_doc):
+        highlighted = set()
+
+        for doc in delete_doc:
+            key = doc_key(doc['_id'])
+            if key in self._frames:
+                self._remove(key)
+
+        for new, old in modify_doc:
+            key = doc_key(new['_id'])
+            if not key in self._frames:
+                continue
+            self._lines[key] = doc_lines(new)
+            self._replace(key, changed_paths(new, old))
+            highlighted.add(key)
+
+        cursor = QtGui.QTextCursor(self.viewer.document())
+        fmt = QtGui.QTextFrameFormat()
+        for doc in reversed(new_doc):
+            key = doc_key(doc['_id'])
+            if key in self._frames:
+                continue
+            cursor.movePosition(QtGui.QTextCursor.Start)
+            self._frames[key] = cursor.insertFrame(fmt)
+            self._lines[key] = doc_lines(doc)
+            self._write(cursor, key, set([()]))
+            highlighted.add(key)
+
+        for key in self._highlighted - highlighted:
+            if key in self._frames:
+                self._replace(key, set())
+        self._highlighted = highlighted
+
 def createComboBox(name, settings, default=None):
-    maxCount = int(settings.value('max_history', 10))
+    maxCount = settings.value('max_history', 10, int)
     comboBox = QtGui.QComboBox()
     comboBox.setEditable(True)
     comboBox.setMaxCount(maxCount)
@@ -145,7 +1795,14 @@ class TabDialog(QtGui.QWidget):
         self._selected_coll = {}
         self._collections = {}
 
-        self.settings = QtCore.QSettings("gui.ini", QtCore.QSettings.IniFormat)
+        self.settings = settings_view()
+
+        threads = self.settings.value('poll_threads', 4, int)
+        self._engine = PollingEngine(threads, self)
+
+        max_pool_size = self.settings.value('max_pool_size', None, int)
+        if max_pool_size is not None:
+            CONNECTIONS.default_options['max_pool_size'] = max_pool_size
 
         self.hostLineEdit = createComboBox('host', self.settings, '127.0.0.1')
         self._host = None
@@ -163,10 +1820,24 @@ class TabDialog(QtGui.QWidget):
         self.connectButton = QtGui.QPushButton("&Connect")
         self.connectButton.clicked.connect(self.connectMDB)
 
-        global GLOBAL_PAUSE
-        self.pauseCheckbox = GLOBAL_PAUSE = QtGui.QCheckBox("&Pause")
+        self.pauseCheckbox = QtGui.QCheckBox("&Pause")
         self.pauseCheckbox.setChecked(False)
 
+        self.connLabel = QtGui.QLabel()
+
+        self.statsButton = QtGui.QPushButton("&Stats")
+        self.statsButton.clicked.connect(self.showStats)
+        self._stats_dialog = None
+
+        self.profilerButton = QtGui.QPushButton("P&rofiler")
+        self.profilerButton.clicked.connect(self.showProfiler)
+        self._profilers = {}
+
+        self.serverButton = QtGui.QPushButton("Ser&ver")
+        self.serverButton.clicked.connect(self.showServerStatus)
+        self._server_status = None
+        self.stats = RollingStats()
+
         connectLayout = QtGui.QHBoxLayout()
         connectLayout.addWidget(self.hostLabel)
         connectLayout.addWidget(self.hostLineEdit)
@@ -174,6 +1845,10 @@ class TabDialog(QtGui.QWidget):
         connectLayout.addWidget(self.dbComboBox)
         connectLayout.addWidget(self.connectButton)
         connectLayout.addWidget(self.pauseCheckbox)
+        connectLayout.addWidget(self.connLabel)
+        connectLayout.addWidget(self.statsButton)
+        connectLayout.addWidget(self.profilerButton)
+        connectLayout.addWidget(self.serverButton)
 
         self.collectionLayout = QtGui.QHBoxLayout()
 
@@ -199,22 +1874,31 @@ class TabDialog(QtGui.QWidget):
         self.upDownSplitter.splitterMoved.connect(f)
         self.upDownSplitter.addWidget(self.leftRightSplitter)
 
+        self.statusLabel = QtGui.QLabel()
+
         mainLayout = QtGui.QVBoxLayout()
         mainLayout.addLayout(connectLayout)
         mainLayout.addLayout(self.collectionLayout)
         mainLayout.addWidget(self.upDownSplitter)
+        mainLayout.addWidget(self.statusLabel)
         self.setLayout(mainLayout)
 
         self.setWindowTitle("MongoDB Monitor")
 
-        self._last_update_db = None
+        self._namespaces = None
         self._is_reset = False
+        self._poll_results = []
 
         timer = QtCore.QTimer(self)
         timer.timeout.connect(self._polling)
         timer.setInterval(50)
         timer.start()
 
+        timer = QtCore.QTimer(self)
+        timer.timeout.connect(self.status_update)
+        timer.setInterval(1000)
+        timer.start()
+
     def svn_check(self, result):
         self.svnCheck.emit(result)
 
@@ -257,8 +1941,16 @@ class TabDialog(QtGui.QWidget):
     def connectMDB(self):
         if self.mdb_conn is None:
             self._host = host = str(self.hostLineEdit.currentText())
-            self.mdb_conn = pymongo.Connection(host)
-            self._last_update_db = None
+            self.mdb_conn = CONNECTIONS.acquire(host)
+
+            ttl = self.settings.value('namespace_ttl', 5.0, float)
+            self._namespaces = ns = NamespaceCache(self.mdb_conn,
+                                                   self._engine, ttl, self)
+            f = lambda names: self._db_names_polled(ns, names)
+            ns.databasesChanged.connect(f)
+            f = lambda db_name, names: self._coll_names_polled(ns, db_name,
+                                                               names)
+            ns.collectionsChanged.connect(f)
 
             self.connectButton.setText("&Disconnect")
             self.hostLineEdit.setEnabled(False)
@@ -266,12 +1958,19 @@ class TabDialog(QtGui.QWidget):
             saveComboBox(self.hostLineEdit, 'host', self.settings)
             self.settings.sync()
         else:
-            self.mdb_conn.disconnect()
+            CONNECTIONS.release(self.mdb_conn)
             del self.mdb_conn
             del self._db
             self.mdb_conn = None
             self._db = None
             self._host = None
+            self._namespaces = None
+            for dialog in self._profilers.values():
+                dialog.close()
+            self._profilers = {}
+            if self._server_status is not None:
+                self._server_status.close()
+                self._server_status = None
             self.reset_coll()
             self.connectButton.setText("&Connect")
             self.hostLineEdit.setEnabled(True)
@@ -315,6 +2014,10 @@ class TabDialog(QtGui.QWidget):
 
         self._db = self.mdb_conn[db_name]
 
+        coll_names = self._namespaces.get(db_name)
+        if coll_names is not None:
+            self.coll_info_update(coll_names)
+
     def reset_coll(self):
         self._is_reset = True
         for name, check_box in self._collections.items():
@@ -330,12 +2033,23 @@ class TabDialog(QtGui.QWidget):
             w.mouseDoubleClickEvent(None)
 
     def _polling(self):
+        timings = {}
+        with measure(timings, 'tick'):
+            self._poll_tick(timings)
+        self.stats.add_all(timings)
+
+    def _poll_tick(self, timings):
+        self.conn_info_update()
+        with measure(timings, 'apply_results'):
+            self.apply_poll_results()
         if self.mdb_conn is None:
             return
 
         try:
-            self.db_info_update()
-            self.coll_info_update(self._db.collection_names())
+            self._namespaces.refresh()
+            if self._db is None:
+                return
+            self._namespaces.refresh(self._db.name)
 
             if  self.pauseCheckbox.isChecked():
                 return
@@ -344,13 +2058,83 @@ class TabDialog(QtGui.QWidget):
         except:
             log.error("-"*60, exc_info=True)
 
-    def db_info_update(self):
-        if self._last_update_db != None and \
-               time.clock() - self._last_update_db <= 5:
+    def poll_windows(self):
+        windows = list(self._selected_coll.items())
+        if self._right_w.name is not None:
+            windows.append(('%s (right)' % self._right_w.name, self._right_w))
+        for index, w in enumerate(self._bottom_w):
+            if w.name is not None:
+                windows.append(('%s (bottom %s)' % (w.name, index+1), w))
+        return windows
+
+    def poll_stats(self):
+        stats = dict((label, w.stats.summary())
+                     for label, w in self.poll_windows())
+        stats['(main loop)'] = self.stats.summary()
+        return stats
+
+    def status_update(self):
+        text = ''
+        w = self._tabWidget.currentWidget()
+        if w is not None and w.name is not None:
+            summary = w.stats.summary()
+            if 'poll' in summary:
+                poll = summary.pop('poll')
+                text = '%s: poll p50 %.0fms p95 %.0fms max %.0fms' % (
+                    w.name, poll['p50'], poll['p95'], poll['max'])
+                if len(summary) != 0:
+                    stage = max(summary, key=lambda x: summary[x]['p95'])
+                    text += ', slowest %s p95 %.0fms' % (
+                        stage, summary[stage]['p95'])
+        if self.statusLabel.text() != text:
+            self.statusLabel.setText(text)
+
+    def showStats(self):
+        if self._stats_dialog is None:
+            self._stats_dialog = PollStatsDialog(self)
+        self._stats_dialog.show()
+        self._stats_dialog.raise_()
+
+    def showProfiler(self):
+        if self._db is None:
+            return
+        key = (self._host, self._db.name)
+        dialog = self._profilers.get(key)
+        if dialog is None:
+            dialog = self._profilers[key] = ProfilerDialog(self, self._db)
+        dialog.show()
+        dialog.raise_()
+
+    def showServerStatus(self):
+        if self.mdb_conn is None:
+            return
+        if self._server_status is None:
+            self._server_status = ServerStatusDialog(self, self._host,
+                                                     self.mdb_conn,
+                                                     self.settings)
+        self._server_status.show()
+        self._server_status.raise_()
+
+    def conn_info_update(self):
+        text, tip = CONNECTIONS.status()
+        if self.connLabel.text() != text:
+            self.connLabel.setText(text)
+        if self.connLabel.toolTip() != tip:
+            self.connLabel.setToolTip(tip)
+
+    def _coll_names_polled(self, ns, db_name, coll_names):
+        if self._namespaces is not ns:
             return
-        self._last_update_db = time.clock()
+        if self._db is None or self._db.name != db_name:
+            return
+        self.coll_info_update(coll_names)
+
+    def _db_names_polled(self, ns, db_names):
+        if self._namespaces is not ns:
+            return
+        self.db_info_update(list(db_names))
 
-        db_names = self.mdb_conn.database_names()
+    def db_info_update(self, db_names):
         c = self.dbComboBox
         last_db_names = [c.itemText(x) for x in xrange(c.count())]
 
@@ -448,8 +2232,61 @@ class TabDialog(QtGui.QWidget):
             if self._tabWidget.count() == 1:
                 self.save_tab_pos()
 
-    def clear_collection(self, name):
-        self._db[name].remove()
+    def apply_poll_results(self):
+        if len(self._poll_results) == 0:
+            return
+        results = self._poll_results
+        self._poll_results = []
+
+        self.setUpdatesEnabled(False)
+        try:
+            for w, result in results:
+                try:
+                    w.apply_poll(result)
+                except:
+                    log.error("-"*60, exc_info=True)
+        finally:
+            self.setUpdatesEnabled(True)
+
+    def cancel_window_jobs(self, w):
+        for key in (w, ('count', w), ('selected', w), ('explain', w),
+                    ('collstats', w)):
+            self._engine.cancel(key)
+
+    def collection(self, name):
+        if self._db is None or name is None:
+            return None
+        return self._db[name]
+
+    def run_job(self, key, job, callback):
+        return self._engine.submit(key, job, callback)
+
+    def invalidate_namespaces(self, db_name=None):
+        if self._namespaces is None:
+            return
+        self._namespaces.invalidate(db_name)
+
+    def clear_collection(self, name, mode, criteria):
+        if mode == 'drop':
+            func = lambda task, coll: drop_and_recreate(task, coll)
+            unit = 'indexes'
+        else:
+            if mode == 'batched':
+                criteria = {}
+            batch_size = self.settings.value('clear_batch_size', 1000, int)
+            pause = self.settings.value('clear_pause', 0.05, float)
+            func = lambda task, coll: delete_batches(task, coll, criteria,
+                                                     batch_size, pause)
+            unit = 'docs'
+
+        db_name = self._db.name
+        task = BackgroundTask('clear %s' % name,
+                              collection_task(self._host, db_name, name,
+                                              func))
+        task.done.connect(lambda ok, result: self.invalidate_namespaces(
+            db_name))
+        TaskDialog(self, task, 'Clearing %s' % name, unit).show()
+        task.start()
 
     def coll_detail_update(self):
         self.coll_window_update(self._tabWidget.currentWidget())
@@ -460,8 +2297,29 @@ class TabDialog(QtGui.QWidget):
     def coll_window_update(self, w):
         if w is None or w.name is None:
             return
-        name = w.name
-        w.polling(self._db[name])
+        coll = self._db[w.name]
+        if not self._engine.is_busy(w) and w.poll_due(time.time()):
+            f = lambda result: self._poll_results.append((w, result))
+            self._engine.submit(w, w.poll_job(coll), f, w.poll_failed)
+
+        key = ('explain', w)
+        if not self._engine.is_busy(key):
+            job = w.explain_job(coll)
+            if job is not None:
+                self._engine.submit(key, job, w.apply_explain)
+
+        key = ('collstats', w)
+        if not self._engine.is_busy(key):
+            job = w.coll_stats_job(self._db, w.name)
+            if job is not None:
+                self._engine.submit(key, job, w.apply_coll_stats)
+
+        key = ('count', w)
+        if self._engine.is_busy(key) or w.pauseAction.isChecked():
+            return
+        job = w.count_job(coll)
+        if job is not None:
+            self._engine.submit(key, job, w.apply_count)
         
 class CollectionWindow(QtGui.QWidget):
     def __init__(self, coll_name, host, db_name,
@@ -475,14 +2333,13 @@ class CollectionWindow(QtGui.QWidget):
         self._hints = {}
         self._tab_text = "List"
 
-        self.settings = QtCore.QSettings("gui.ini", QtCore.QSettings.IniFormat)
         self.connect_info = (host, db_name, coll_name)
-        self.settings.beginGroup('%s-%s-%s' % self.connect_info)
+        self.settings = settings_view('%s-%s-%s' % self.connect_info)
         
         self._tabWidget = QtGui.QTabWidget()
 
-        self.model = QtGui.QStandardItemModel(0, 1, self)
-        self._headers = [None]
+        self.model = DocTableModel(self)
+        self._headers = self.model.headers
 
         self.proxyView = QtGui.QTreeView(self)
         self.proxyView.setSelectionMode(QtGui.QAbstractItemView.SingleSelection)
@@ -499,11 +2356,63 @@ class CollectionWindow(QtGui.QWidget):
         self.proxyView.setColumnHidden(0, True)
 
         self.detailViewer = QtGui.QTextBrowser()
-        self._last_docs = []
-        self._last_ids = []
+        self._detail = DocDetailView(self.detailViewer)
+        self._differ = DocDiff()
+        self._generation = 0
+        self._detail_stale = False
+
+        self.max_count = 50
+        self._lazy = self.settings.value('lazy', False, bool)
+        self._update_sorting()
+        self._want_more = False
+        self._lazy_head = None
+        self._lazy_tail = None
+        self._incremental = self.settings.value('incremental', False, bool)
+        self._hwm_field = self.settings.value('hwm_field', '_id')
+        self.recheck_interval = self.settings.value('recheck_interval', 30.0,
+                                                    float)
+        self._hwm = None
+        self._recheck_time = 0
+        self.model.moreRequested.connect(self._fetch_more)
+
+        self.schedule = PollSchedule()
+        self._hidden = True
+
+        self.stats = RollingStats()
+        self.slow_poll_ms = self.settings.value('slow_poll_ms', 1000.0, float)
+
+        self._explain = None
+        self._explain_wanted = True
+
+        self._count_mode = self._saved_count_mode()
+        self.count_interval = self.settings.value('count_interval', 30.0, float)
+        self._count = None
+        self._count_source = None
+        self._count_time = 0
+        self._count_wanted = False
+
+        self.statsViewer = QtGui.QTextBrowser()
+        self.stats_interval = self.settings.value('stats_interval', 60.0, float)
+        self._coll_stats = None
+        self._coll_stats_time = 0
+        self._coll_stats_generation = None
+        self._coll_stats_wanted = True
+
+        self.selectedViewer = QtGui.QTextBrowser()
+        self.selectedViewer.hide()
+        self._selected = None
+
+        self.detailSplitter = QtGui.QSplitter(QtCore.Qt.Vertical)
+        self.detailSplitter.addWidget(self.selectedViewer)
+        self.detailSplitter.addWidget(self.detailViewer)
 
         self._tabWidget.addTab(self.proxyView, self._tab_text)
-        self._tabWidget.addTab(self.detailViewer, 'Detail')
+        self._tabWidget.addTab(self.detailSplitter, 'Detail')
+        self._tabWidget.addTab(self.statsViewer, 'Stats')
+
+        self.proxyView.selectionModel().selectionChanged.connect(
+            self.selectionChanged)
+        self._tabWidget.currentChanged.connect(self.refreshDetail)
 
         funcs = self.functionAction = []
         def _add_func(funcs, name, trigger, parent):
@@ -522,6 +2431,9 @@ class CollectionWindow(QtGui.QWidget):
         self.fnt = QtGui.QFont()
         self.fnt.setPixelSize(14)
         self.proxyView.setFont(self.fnt)
+        self.detailViewer.setFont(self.fnt)
+        self.selectedViewer.setFont(self.fnt)
+        self.statsViewer.setFont(self.fnt)
 
         self.subDialogAction = []
 
@@ -551,6 +2463,40 @@ class CollectionWindow(QtGui.QWidget):
         f = lambda : self.mouseDoubleClickEvent(None)
         self.closeAction = QtGui.QAction("close", self,
                                          triggered=f)
+        self.lazyAction = QtGui.QAction("Lazy loading", self,
+                                        checkable=True)
+        self.lazyAction.setChecked(self._lazy)
+        self.lazyAction.toggled.connect(self.lazyChanged)
+        self.incrementalAction = QtGui.QAction("Incremental", self,
+                                               checkable=True)
+        self.incrementalAction.setChecked(self._incremental)
+        self.incrementalAction.toggled.connect(self.incrementalChanged)
+        self.hwmFieldAction = QtGui.QAction("High-water-mark field", self,
+                                            triggered=self.editHwmField)
+        self.pauseAction = QtGui.QAction("Pause", self, checkable=True)
+        self.pauseAction.toggled.connect(self.pauseChanged)
+
+        self._exclude_fields = self._saved_exclude_fields()
+        self.excludeAction = QtGui.QAction("Excluded fields", self,
+                                           triggered=self.editExcludeFields)
+        self.exportAction = QtGui.QAction("Export...", self,
+                                          triggered=self.exportView)
+        self.importAction = QtGui.QAction("Import...", self,
+                                          triggered=self.importFile)
+
+        self.countMenu = QtGui.QMenu("Count", self)
+        group = QtGui.QActionGroup(self)
+        self._count_actions = {}
+        for mode, text in COUNT_MODES:
+            action = QtGui.QAction(text, group, checkable=True)
+            action.setChecked(mode == self._count_mode)
+            action.toggled.connect(CheckboxCallback(self.countModeChanged,
+                                                    mode))
+            self._count_actions[mode] = action
+            self.countMenu.addAction(action)
+        self.countMenu.addSeparator()
+        self.countMenu.addAction(QtGui.QAction("Refresh count", self,
+                                               triggered=self.refreshCount))
 
         self.color = QtGui.QColor(QtCore.qrand() % 256, QtCore.qrand() % 256,
                                   QtCore.qrand() % 256)
@@ -580,6 +2526,16 @@ class CollectionWindow(QtGui.QWidget):
     def add_filter(self, filter_exp):
         self._filter_exp = filter_exp
         self._criteria = self._gen_criteria()
+        self._generation += 1
+        self.parent.cancel_window_jobs(self)
+        self.schedule.reset()
+        self._count = None
+        self._explain = None
+        self._explain_wanted = True
+        self._hwm = None
+        self._change_hint('explain', '')
+        if self._lazy:
+            self._reset_rows()
 
     def _change_hint(self, key, hint):
         if not key in self._hints:
@@ -601,19 +2557,15 @@ class CollectionWindow(QtGui.QWidget):
 
         self._change_hint(key, hint)
         
-        criteria = {}
-        try:
-            if not self._filter_exp.startswith("{"):
-                exp = '{%s}' % self._filter_exp
-            else:
-                exp = self._filter_exp
-            criteria = eval(exp)
-        except:
-            pass
+        criteria = eval_filter(self._filter_exp)
+        if criteria is None:
+            return {}
         return criteria
 
     def closeEvent(self, event):
         self.closeSubDialog()
+        self._generation += 1
+        self.parent.cancel_window_jobs(self)
         super(CollectionWindow, self).closeEvent(event)
 
     def paint(self, painter, option, widget):
@@ -682,6 +2634,14 @@ class CollectionWindow(QtGui.QWidget):
             menu.addAction(action)
         menu.addSeparator()
         menu.addAction(self.closeAction)
+        menu.addAction(self.pauseAction)
+        menu.addAction(self.lazyAction)
+        menu.addAction(self.incrementalAction)
+        menu.addAction(self.hwmFieldAction)
+        menu.addMenu(self.countMenu)
+        menu.addAction(self.excludeAction)
+        menu.addAction(self.exportAction)
+        menu.addAction(self.importAction)
         for action in self.functionAction:
             menu.addAction(action)
         menu.addSeparator()
@@ -696,22 +2656,41 @@ class CollectionWindow(QtGui.QWidget):
         self.closeSubDialog()
         self.add_filter('')
 
-        m = self.model
-        m.removeRows(0, m.rowCount())
-
-        m.removeColumns(1, len(self._headers)-1)
-        self._headers = [None]
+        self.model.clear()
         self._column_actions = {}
 
-        self.detailViewer.clear()
-        self._last_docs = []
-        self._last_ids = []
+        self._detail.clear()
+        self._differ = DocDiff()
+        self._generation += 1
+        self.parent.cancel_window_jobs(self)
+        self.schedule.reset()
+        self.pauseAction.setChecked(False)
+        self._selected = None
+        self.selectedViewer.hide()
+        self.stats = RollingStats()
+        self._coll_stats = None
+        self._coll_stats_wanted = True
+        self.statsViewer.clear()
         
         self.name = coll_name
         self.settings.endGroup()
         self.connect_info = (host, db_name, coll_name)
         self.settings.beginGroup('%s-%s-%s' % self.connect_info)
 
+        self._want_more = False
+        self._lazy_head = None
+        self._lazy_tail = None
+        self._lazy = self.settings.value('lazy', False, bool)
+        self.lazyAction.setChecked(self._lazy)
+        self._update_sorting()
+        self._incremental = self.settings.value('incremental', False, bool)
+        self.incrementalAction.setChecked(self._incremental)
+        self._hwm_field = self.settings.value('hwm_field', '_id')
+        self._hwm = None
+        self._count_mode = self._saved_count_mode()
+        self._count_actions[self._count_mode].setChecked(True)
+        self._exclude_fields = self._saved_exclude_fields()
+
         self._tab_text = '%s/List' % coll_name
 
     def toRight(self):
@@ -721,7 +2700,25 @@ class CollectionWindow(QtGui.QWidget):
         self.parent.bottom_window(self.name)
 
     def clearCollection(self):
-        warning = 'Do you really want to clear this collection?'
+        texts = [text for mode, text in CLEAR_MODES]
+        text, ok = QtGui.QInputDialog.getItem(self, self.name, 'Clear mode:',
+                                              texts, 0, False)
+        if not ok:
+            return
+        mode = CLEAR_MODES[texts.index(text)][0]
+
+        criteria = None
+        warning = 'Do you really want to clear this collection?\n%s' % text
+        if mode == 'filter':
+            # an empty or broken filter would match every document
+            criteria = eval_filter(self._filter_exp)
+            if not criteria:
+                QtGui.QMessageBox.warning(
+                    self, 'Warning',
+                    'The filter is empty or invalid, nothing was deleted:'
+                    '\n%s' % (self._filter_exp or '(no filter)'))
+                return
+            warning += '\n%s' % (criteria,)
         ret = QtGui.QMessageBox.warning(self, 'Warning',
                                         warning,
                                         QtGui.QMessageBox.Yes |
@@ -729,7 +2726,7 @@ class CollectionWindow(QtGui.QWidget):
                                         QtGui.QMessageBox.No)
         if ret == QtGui.QMessageBox.No:
             return
-        self.parent.clear_collection(self.name)
+        self.parent.clear_collection(self.name, mode, criteria)
 
     def mouseDoubleClickEvent(self, event):
         if not self.is_side:
@@ -738,109 +2735,631 @@ class CollectionWindow(QtGui.QWidget):
             self.set_data(None, None, None)
             self.hide()
 
-    def polling(self, coll):
-        max_count = 50
-        if self.name.endswith('.chunks'):
-            cursor = coll.find(self._criteria, {'data':0})
-        else:
-            cursor = coll.find(self._criteria)
-        total_count = cursor.count()
-        if total_count > max_count:
-            hint = ' - limited(%s/%s)' % (max_count, total_count)
-            cursor = cursor.limit(max_count)
-            result = self._get_purpose_orderby()
-            if result is None:
-                key = '_id'
-                order = pymongo.DESCENDING
-            else:
-                key = result[0]
-                order = getattr(pymongo, result[1].upper().replace('ORDER',''))
-            cursor = cursor.sort(key, order)
-        else:
-            hint = ' - total(%s)' % total_count
+    def _sort_spec(self):
+        if self._incremental and not self._lazy:
+            return self._hwm_field, pymongo.DESCENDING
+        result = self._get_purpose_orderby()
+        # lazy pages walk _id only, $gt/$lt on another column stops at
+        # the first null, missing or differently typed value
+        if result is None or (self._lazy and result[0] != '_id'):
+            return '_id', pymongo.DESCENDING
+        key = result[0]
+        order = getattr(pymongo, result[1].upper().replace('ORDER',''))
+        return key, order
+
+    def _visible_rows(self):
+        view = self.proxyView
+        count = self.model.rowCount()
+        if count == 0:
+            return 0, -1
+        first = view.indexAt(QtCore.QPoint(0, 0)).row()
+        last = view.indexAt(QtCore.QPoint(0, view.viewport().height()-1)).row()
+        if first < 0:
+            first = 0
+        if last < 0:
+            last = count - 1
+        return first, last
+
+    def _fetch_more(self):
+        self._want_more = True
+
+    def pauseChanged(self, checked):
+        if not checked:
+            self.schedule.reset()
+
+    def poll_due(self, now):
+        if self.pauseAction.isChecked():
+            return False
+        if self.visibleRegion().isEmpty():
+            self._hidden = True
+            return False
+        if self._hidden or self._want_more:
+            self._hidden = False
+            return True
+        return self.schedule.due(now)
+
+    def lazyChanged(self, checked):
+        if checked == self._lazy:
+            return
+        self._lazy = checked
+        self.settings.setValue('lazy', checked)
+        self.settings.sync()
+        if checked:
+            self.incrementalAction.setChecked(False)
+        self._update_sorting()
+        self._reset_rows()
 
-        self._change_hint('limit', hint)
-            
-        docs = [trans_doc(x) for x in cursor]
-        self._updateDoc(docs)
+    def _update_sorting(self):
+        # lazy rows come in _id order, a column sort would reorder them
+        self.proxyView.setSortingEnabled(not self._lazy)
 
-    def _updateDoc(self, docs):
-        self.column_info_update(docs)
+    def incrementalChanged(self, checked):
+        if checked == self._incremental:
+            return
+        self._incremental = checked
+        self.settings.setValue('incremental', checked)
+        self.settings.sync()
+        if checked:
+            self.lazyAction.setChecked(False)
+        self._explain_wanted = True
+        self._reset_rows()
+
+    def editHwmField(self):
+        text, ok = QtGui.QInputDialog.getText(
+            self, self.name, 'Monotonic field for incremental polling:',
+            QtGui.QLineEdit.Normal, self._hwm_field)
+        text = text.strip()
+        if not ok or not text or text == self._hwm_field:
+            return
+        self._hwm_field = text
+        self.settings.setValue('hwm_field', text)
+        self.settings.sync()
+        if self._incremental:
+            self._explain_wanted = True
+            self._reset_rows()
+
+    def _reset_rows(self):
+        self.model.clear_rows()
+        self._detail.clear()
+        self._differ = DocDiff()
+        self._want_more = False
+        self._lazy_head = None
+        self._lazy_tail = None
+        self._hwm = None
+        self._generation += 1
+        self.parent.cancel_window_jobs(self)
+        self.schedule.reset()
+
+    def query_spec(self):
+        key, order = self._sort_spec()
+        return self._criteria, self._projection(key), [(key, order)], \
+               self.max_count
+
+    def requestExplain(self):
+        self._explain_wanted = True
+
+    def explain_job(self, coll):
+        if not self._explain_wanted:
+            return None
+        self._explain_wanted = False
+
+        criteria, projection, sort, limit = self.query_spec()
+        generation = self._generation
+        def job():
+            cursor = coll.find(criteria, projection).sort(sort).limit(limit)
+            return generation, summarize_explain(cursor.explain())
+        return job
+
+    def apply_explain(self, result):
+        generation, summary = result
+        if generation != self._generation:
+            return
+        self._explain = summary
+        if summary['collscan']:
+            self._change_hint('explain', ' - COLLSCAN!')
+        else:
+            self._change_hint('explain', '')
+
+        dialog = self._sub_dialogs.get('filter')
+        if dialog is not None:
+            dialog.showExplain(summary)
+
+    def coll_stats_job(self, db, name):
+        if not self._coll_stats_wanted:
+            if self.statsViewer.visibleRegion().isEmpty():
+                return None
+            if self._coll_stats_generation == self._generation and \
+               time.time() - self._coll_stats_time < self.stats_interval:
+                return None
+        self._coll_stats_wanted = False
+        self._coll_stats_time = time.time()
+
+        generation = self._generation
+        def job():
+            stats = db.command('collStats', name)
+            cache_size = None
+            try:
+                status = db.command('serverStatus')
+                cache_size = status['wiredTiger']['cache'][
+                    'maximum bytes configured']
+            except:
+                pass
+            return (generation, time.time(),
+                    summarize_coll_stats(stats, cache_size))
+        return job
+
+    def apply_coll_stats(self, result):
+        generation, now, summary = result
+        if generation != self._generation:
+            return
+        self._coll_stats_generation = generation
+        growth = None
+        if self._coll_stats is not None:
+            last_time, last = self._coll_stats
+            growth = coll_growth(summary, last, now - last_time)
+        self._coll_stats = (now, summary)
+        self.statsViewer.setPlainText(format_coll_stats(summary, growth))
+
+    def poll_job(self, coll):
+        if self._lazy:
+            return self._lazy_poll_job(coll)
+        if self._incremental and self._hwm is not None and \
+           time.time() - self._recheck_time < self.recheck_interval:
+            return self._incremental_poll_job(coll)
+
+        criteria, projection, sort, max_count = self.query_spec()
+        generation = self._generation
+        differ = self._differ
+        count_source = self._poll_count_source()
+        field = None
+        if self._incremental:
+            field = self._hwm_field
+            self._recheck_time = time.time()
+
+        def job():
+            timings = {}
+            cursor = coll.find(criteria, projection)
+            cursor = cursor.sort(sort).limit(max_count)
+            docs = fetch_docs(cursor, timings)
+
+            count = None
+            source = None
+            if len(docs) < max_count:
+                count = len(docs)
+                source = 'exact'
+            elif count_source is not None:
+                with measure(timings, 'count'):
+                    count = count_documents(coll, criteria, count_source)
+                source = count_source
+
+            with measure(timings, 'diff'):
+                changes = differ.diff(docs)
+            hwm = None
+            if field is not None:
+                hwm = high_water_mark(docs, field)
+            return PollResult(generation, docs, changes,
+                              count=count, count_source=source,
+                              timings=timings, hwm=hwm)
+        return job
+
+    def _incremental_poll_job(self, coll):
+        # only documents past the high-water mark, existing rows are
+        # rechecked by a full poll every recheck_interval seconds
+        criteria, projection, sort, max_count = self.query_spec()
+        field = self._hwm_field
+        hwm = self._hwm
+        generation = self._generation
+        differ = self._differ
+
+        def job():
+            timings = {}
+            cursor = coll.find(and_criteria(criteria, {field: {'$gt': hwm}}),
+                               projection)
+            cursor = cursor.sort(sort).limit(max_count)
+            docs = fetch_docs(cursor, timings)
+            with measure(timings, 'diff'):
+                scope = trim_scope(differ, docs, field, max_count)
+                changes = differ.diff(docs, scope)
+            return PollResult(generation, docs, changes, timings=timings,
+                              hwm=high_water_mark(docs, field, hwm))
+        return job
+
+    def _lazy_poll_job(self, coll):
+        page_size = self.max_count
+        criteria = self._criteria
+        key, order = self._sort_spec()
+        projection = self._projection(key)
+        sort = [(key, order)]
+        reverse = [(key, -order)]
+
+        generation = self._generation
+        differ = self._differ
+        m = self.model
+        count = m.rowCount()
+
+        # the rows may be sorted on screen, the keyset bounds are the
+        # first and last documents in _id order
+        if self._want_more and count != 0 and self._lazy_tail is not None:
+            self._want_more = False
+            after = keyset_criteria(self._lazy_tail, key, order)
+            def page_job():
+                timings = {}
+                cursor = coll.find(and_criteria(criteria, after), projection)
+                cursor = cursor.sort(sort).limit(page_size)
+                docs = fetch_docs(cursor, timings)
+                with measure(timings, 'diff'):
+                    changes = differ.diff(docs, [])
+                return PollResult(generation, docs, changes,
+                                  append=True,
+                                  more=len(docs) == page_size,
+                                  timings=timings,
+                                  tail=docs[-1] if docs else None)
+            return page_job
+        self._want_more = False
+
+        first, last = self._visible_rows()
+        scope = [m.key(row) for row in xrange(first, last+1)]
+        ids = [untrans_item(m.doc(row)['_id'])
+               for row in xrange(first, last+1)]
+        before = None
+        if count != 0 and self._lazy_head is not None:
+            before = keyset_criteria(self._lazy_head, key, order,
+                                     after=False)
+        count_source = self._poll_count_source()
+
+        def job():
+            timings = {}
+            total_count = None
+            if count_source is not None:
+                with measure(timings, 'count'):
+                    total_count = count_documents(coll, criteria,
+                                                  count_source)
+
+            docs = []
+            more = None
+            head = tail = None
+            if first == 0:
+                if before is None:
+                    cursor = coll.find(criteria, projection)
+                    cursor = cursor.sort(sort).limit(page_size)
+                    docs = fetch_docs(cursor, timings)
+                    more = len(docs) == page_size
+                    if docs:
+                        tail = docs[-1]
+                else:
+                    # walk up from the first row so no gap is left
+                    cursor = coll.find(and_criteria(criteria, before),
+                                       projection)
+                    cursor = cursor.sort(reverse).limit(page_size)
+                    docs = fetch_docs(cursor, timings)
+                    docs.reverse()
+                if docs:
+                    head = docs[0]
+            if len(ids) != 0:
+                cursor = coll.find(and_criteria(criteria,
+                                                {'_id': {'$in': ids}}),
+                                   projection)
+                docs.extend(fetch_docs(cursor, timings))
+
+            with measure(timings, 'diff'):
+                changes = differ.diff(docs, scope)
+            return PollResult(generation, docs, changes,
+                              count=total_count, count_source=count_source,
+                              more=more, timings=timings, head=head,
+                              tail=tail)
+        return job
+
+    def _saved_exclude_fields(self):
+        exclude = self.settings.value('exclude', None)
+        if exclude is None:
+            if self.name is not None and self.name.endswith('.chunks'):
+                return ['data']
+            return []
+        return [x.strip() for x in exclude.split(',') if x.strip()]
+
+    def editExcludeFields(self):
+        text, ok = QtGui.QInputDialog.getText(
+            self, self.name, 'Fields never fetched (comma separated):',
+            QtGui.QLineEdit.Normal, ', '.join(self._exclude_fields))
+        if not ok:
+            return
+        self._exclude_fields = [x.strip() for x in text.split(',')
+                                if x.strip()]
+        self.settings.setValue('exclude', ','.join(self._exclude_fields))
+        self.settings.sync()
+        self._fetch_selected()
 
-        self.process_docs(docs)
+    def exportView(self):
+        if self.parent.collection(self.name) is None:
+            return
+        path, selected = QtGui.QFileDialog.getSaveFileName(
+            self, 'Export %s' % self.name, '%s.jsonl' % self.name,
+            EXPORT_FILTERS)
+        if not path:
+            return
 
-        if len(self.new_doc) == 0 and \
-           len(self.modify_doc) == 0 and \
-           len(self.delete_doc) == 0:
+        headers = None
+        projection = self._projection()
+        if path.endswith('.csv') or path.endswith('.csv.gz'):
+            # headers hold the utf-8 names made by trans_doc
+            headers = [name.decode('utf-8') if isinstance(name, str) else name
+                       for index, name in enumerate(self._headers)
+                       if index != 0 and
+                       not self.proxyView.isColumnHidden(index)]
+            projection = dict((name, 1) for name in headers)
+            projection['_id'] = 1
+
+        criteria = self._criteria
+        total = None
+        if self._count_source in ('exact', 'cached'):
+            total = self._count
+        def func(task, coll):
+            pages = export_pages(task, coll, criteria, projection)
+            return export_docs(task, pages, path, headers, total)
+        host, db_name, coll_name = self.connect_info
+        task = BackgroundTask('export %s' % self.name,
+                              collection_task(host, db_name, coll_name,
+                                              func))
+        TaskDialog(self, task, 'Exporting %s' % self.name, 'docs').show()
+        task.start()
+
+    def importFile(self):
+        if self.parent.collection(self.name) is None:
+            return
+        path, selected = QtGui.QFileDialog.getOpenFileName(
+            self, 'Import into %s' % self.name, '', IMPORT_FILTERS)
+        if not path:
             return
-        
-        self.detail_viewer_update()
-        self.column_detail_update()
 
-    def process_docs(self, docs):
-        self.new_doc = []
-        self.modify_doc = []
-        self.same_doc = []
-        self.delete_doc = []
+        batch_size, ok = QtGui.QInputDialog.getInt(
+            self, self.name, 'Documents per insert batch:',
+            self.settings.value('import_batch_size', 1000, int), 1, 100000)
+        if not ok:
+            return
+        modes = ['Unordered, continue after errors',
+                 'Ordered, stop at the first error']
+        mode, ok = QtGui.QInputDialog.getItem(self, self.name, 'Insert mode:',
+                                              modes, 0, False)
+        if not ok:
+            return
+        ordered = modes.index(mode) == 1
+        self.settings.setValue('import_batch_size', batch_size)
+        self.settings.sync()
 
-        if len(docs) == 0:
-            self.delete_doc = self._last_docs
-            self._last_docs = []
-            self._last_ids = []
+        workers = self.settings.value('import_workers',
+                                      multiprocessing.cpu_count(), int)
+        was_paused = self.pauseAction.isChecked()
+        self.pauseAction.setChecked(True)
+        func = lambda task, coll: import_docs(task, coll, path, ordered,
+                                              batch_size, workers)
+        host, db_name, coll_name = self.connect_info
+        task = BackgroundTask('import %s' % self.name,
+                              collection_task(host, db_name, coll_name,
+                                              func))
+        task.done.connect(lambda ok, result: self.importFinished(was_paused))
+        TaskDialog(self, task, 'Importing into %s' % self.name,
+                   'docs').show()
+        task.start()
+
+    def importFinished(self, was_paused):
+        if not was_paused:
+            self.pauseAction.setChecked(False)
+        self.parent.invalidate_namespaces(self.connect_info[1])
+
+    def _exclude_projection(self):
+        if len(self._exclude_fields) == 0:
+            return None
+        return dict((name, 0) for name in self._exclude_fields)
+
+    def _projection(self, *required):
+        actions = self._column_actions
+        shown = [name for name, action in actions.items()
+                 if action.isChecked()]
+        if len(shown) == len(actions):
+            return self._exclude_projection()
+
+        projection = dict((name, 1) for name in shown
+                          if not name in self._exclude_fields)
+        for name in required:
+            projection[name] = 1
+        projection['_id'] = 1
+        return projection
+
+    def selectionChanged(self, selected, deselected):
+        indexes = self.proxyView.selectionModel().selectedIndexes()
+        if len(indexes) == 0:
+            self._selected = None
+            self.selectedViewer.hide()
             return
+        doc = self.model.doc(indexes[0].row())
+        self._selected = (untrans_item(doc['_id']), doc_key(doc['_id']))
+        self._fetch_selected()
 
-        if not '_id' in docs[0]:
+    def _fetch_selected(self):
+        coll = self.parent.collection(self.name)
+        if self._selected is None or coll is None:
+            return
+        _id, key = self._selected
+        projection = self._exclude_projection()
+        generation = self._generation
+        job = lambda: (generation, key,
+                       coll.find_one({'_id': _id}, projection))
+        self.parent.run_job(('selected', self), job, self.apply_selected)
+
+    def apply_selected(self, result):
+        generation, key, doc = result
+        if generation != self._generation or self._selected is None:
             return
+        if self._selected[1] != key:
+            self._fetch_selected()
+            return
+        if doc is None:
+            self.selectedViewer.hide()
+            return
+        self.selectedViewer.setPlainText(show_dic([trans_doc(doc)]))
+        self.selectedViewer.show()
+
+    def _poll_count_source(self):
+        if self._count_mode == 'exact':
+            return 'exact'
+        if self._count_mode == 'estimate' and len(self._criteria) == 0:
+            return 'estimate'
+        return None
+
+    def count_job(self, coll):
+        if self._poll_count_source() is not None:
+            return None
+        if not self._count_wanted:
+            if self._count_mode == 'manual':
+                return None
+            if self.visibleRegion().isEmpty():
+                return None
+            if self._count is not None and \
+               time.time() - self._count_time < self.count_interval:
+                return None
+        self._count_wanted = False
+
+        criteria = self._criteria
+        generation = self._generation
+        def job():
+            start = time.time()
+            count = count_documents(coll, criteria, 'exact')
+            return generation, count, time.time() - start
+        return job
+
+    def apply_count(self, result):
+        generation, count, seconds = result
+        if generation != self._generation:
+            return
+        self.stats.add('count', seconds)
+        self._set_count(count, 'cached')
+        self._update_limit_hint()
+
+    def _set_count(self, count, source):
+        self._count = count
+        self._count_source = source
+        self._count_time = time.time()
+
+    def _count_text(self):
+        if self._count is None:
+            return '?'
+        if self._count_source == 'estimate':
+            return '~%s' % self._count
+        if self._count_source == 'cached':
+            return '%s, %ds ago' % (self._count,
+                                    time.time() - self._count_time)
+        return '%s' % self._count
+
+    def _update_limit_hint(self):
+        total = self._count_text()
+        if self._lazy:
+            hint = ' - lazy(%s/%s)' % (self.model.rowCount(), total)
+        elif self._count is not None and self._count <= self.max_count:
+            hint = ' - total(%s)' % total
+        else:
+            hint = ' - limited(%s/%s)' % (self.max_count, total)
+        self._change_hint('limit', hint)
 
-        last_docs = self._last_docs
-        last_ids = self._last_ids
+    def _saved_count_mode(self):
+        mode = self.settings.value('count_mode', 'exact')
+        if not mode in dict(COUNT_MODES):
+            mode = 'exact'
+        return mode
 
-        for doc in docs:
-            if not doc in last_docs:
-                if doc['_id'] not in last_ids:
-                    self.new_doc.append(doc)
-                else:
-                    index = last_ids.index(doc['_id'])
-                    old_doc = last_docs[index]
-                    self.modify_doc.append((doc, old_doc))
-            else:
-                self.same_doc.append(doc)
+    def countModeChanged(self, mode, checked):
+        if not checked or mode == self._count_mode:
+            return
+        self._count_mode = mode
+        self.settings.setValue('count_mode', mode)
+        self.settings.sync()
+        self._count = None
+        self._update_limit_hint()
 
-        new_ids = [doc['_id'] for doc in docs]
-        for _id in last_ids:
-            if not _id in new_ids:
-                index = last_ids.index(_id)
-                self.delete_doc.append(last_docs[index])
+    def refreshCount(self):
+        self._count_wanted = True
 
-        self._last_docs = docs
-        self._last_ids = new_ids
+    def poll_failed(self, error):
+        # back off like an idle poll instead of resending every tick
+        self.schedule.record(False, time.time())
 
-    def detail_viewer_update(self):
-        self.detailViewer.clear()
-        fnt = self.fnt
-        
-        fnt.setBold(True)
-        self.detailViewer.setCurrentFont(fnt)
-        self.detailViewer.insertPlainText(show_dic(self.new_doc))
+    def apply_poll(self, result):
+        if result.generation != self._generation:
+            return
 
-        for new, old in self.modify_doc:
-            new_detail = show_dic([new]).split('\n')
-            old_detail = show_dic([old]).split('\n')
+        timings = result.timings
+        self._updateDoc(result.docs, result.changes, result.append, timings)
+        self.stats.add_all(timings)
+
+        total = sum(timings.values())
+        self.stats.add('poll', total)
+        if total * 1000 > self.slow_poll_ms:
+            stages = ', '.join('%s %.0fms' % (stage, seconds * 1000)
+                               for stage, seconds in sorted(timings.items()))
+            log.info("slow poll %s.%s %.0fms: %s", self.connect_info[1],
+                     self.name, total * 1000, stages)
+
+        changed = len(self.new_doc) != 0 or \
+                  len(self.modify_doc) != 0 or \
+                  len(self.delete_doc) != 0
+        self.schedule.record(changed, time.time())
+
+        if self._selected is not None:
+            for new, old in self.modify_doc:
+                if doc_key(new['_id']) == self._selected[1]:
+                    self._fetch_selected()
+                    break
 
-            for line in new_detail:
-                if line in old_detail:
-                    fnt.setBold(False)
-                else:
-                    fnt.setBold(True)
-                self.detailViewer.setCurrentFont(fnt)
-                self.detailViewer.insertPlainText(line+'\n')
-            self.detailViewer.moveCursor(QtGui.QTextCursor.MoveOperation.PreviousCharacter)
+        if result.hwm is not None:
+            self._hwm = result.hwm
+        if result.head is not None:
+            self._lazy_head = result.head
+        if result.tail is not None:
+            self._lazy_tail = result.tail
+        if result.more is not None:
+            self.model.more = result.more
+        if result.count is not None:
+            self._set_count(result.count, result.count_source)
+        self._update_limit_hint()
+
+    def _updateDoc(self, docs, changes, append=False, timings=None):
+        if timings is None:
+            timings = {}
+
+        self.refreshDetail()
+        with measure(timings, 'column_info_update'):
+            self.column_info_update(docs)
+
+        (self.new_doc, self.modify_doc, self.same_doc,
+         self.delete_doc, state) = changes
+        self._differ.commit(state)
+
+        if len(self.new_doc) == 0 and \
+           len(self.modify_doc) == 0 and \
+           len(self.delete_doc) == 0:
+            return
+        
+        with measure(timings, 'detail_viewer_update'):
+            self.detail_viewer_update()
+        with measure(timings, 'column_detail_update'):
+            self.column_detail_update(append)
 
-        fnt.setBold(False)
-        self.detailViewer.setCurrentFont(fnt)
-        self.detailViewer.insertPlainText("="*80 + '\n' + show_dic(self.same_doc))
+    def detail_viewer_update(self):
+        # documents are only rendered, and so converted, while the
+        # Detail tab is on screen
+        if self.detailViewer.visibleRegion().isEmpty():
+            self._detail_stale = True
+            return
+        self._detail.update(self.new_doc, self.modify_doc, self.delete_doc)
 
-        self.detailViewer.moveCursor(QtGui.QTextCursor.MoveOperation.Start)
+    def refreshDetail(self, index=None):
+        if not self._detail_stale or \
+           self.detailViewer.visibleRegion().isEmpty():
+            return
+        self._detail_stale = False
+        self._detail.clear()
+        m = self.model
+        self._detail.update([m.doc(row) for row in xrange(m.rowCount())],
+                            [], [])
 
     def sectionSizeChanged(self, index, old_size, new_size):
         if self.is_side:
@@ -859,6 +3378,7 @@ class CollectionWindow(QtGui.QWidget):
         order = self.proxyView.header().sortIndicatorOrder().name
         self.settings.setValue('orderBy', [name, order])
         self.settings.sync()
+        self._explain_wanted = True
 
     def columnChanged(self, name, checked):
         self.display_column(name, not checked)
@@ -869,10 +3389,9 @@ class CollectionWindow(QtGui.QWidget):
     def display_column(self, name, is_hide):
         index = self._headers.index(name)
         
-        size = self.settings.value(name, None)
+        size = self.settings.value(name, None, int)
         if size is not None:
-            self.proxyView.header().resizeSection(index,
-                                                  int(size))
+            self.proxyView.header().resizeSection(index, size)
         
         self.proxyView.setColumnHidden(index, is_hide)
 
@@ -886,59 +3405,24 @@ class CollectionWindow(QtGui.QWidget):
             if name in self._headers:
                 continue
             
-            index = len(self._headers)
-            self._headers.append(name)
+            index = self.model.append_column(name)
 
             action = QtGui.QAction(name, self, checkable=True)
             action.toggled.connect(CheckboxCallback(self.columnChanged,
                                                     name))
             self._column_actions[name] = action
 
-            self.model.appendColumn([])
-            self.model.setHeaderData(index, QtCore.Qt.Horizontal, name)
-
             if name in history or len(history) == 0:
                 action.setChecked(True)
             else:
                 self.proxyView.setColumnHidden(index, True)
 
-    def update_model_item(self, row, doc):
-        m = self.model
-        for index in xrange(1, len(self._headers)):
-            k = self._headers[index]
-            v = doc.get(k, '')
-            m.setData(m.index(row, index), str(v)+'\n')
-        m.setData(m.index(row, 0), str(doc))
-
-    def column_detail_update(self):
-        m = self.model
-
-        delete_str = [str(doc) for doc in self.delete_doc]
-        flag = True
-        while flag:
-            flag = False
-            for row in xrange(m.rowCount()):
-                old_str = m.data(m.index(row, 0))
-                if old_str in delete_str:
-                    m.removeRow(row)
-                    flag = True
-                    break
-
-        modify_new = {}
-        for new, old in self.modify_doc:
-            modify_new[str(old)] = new
-            
-        for row in xrange(m.rowCount()):
-            old = m.data(m.index(row, 0))
-            if old in modify_new:
-                self.update_model_item(row, modify_new[old])
-
-        for doc in self.new_doc:
-            m.insertRow(0)
-            self.update_model_item(0, doc)
+    def column_detail_update(self, append=False):
+        self.model.apply_changes(self.new_doc, self.modify_doc,
+                                 self.delete_doc, append)
 
         result = self._get_purpose_orderby()
-        if result is None:
+        if result is None or self._lazy:
             return
         name, order = result
         index = self._headers.index(name)
@@ -963,12 +3447,14 @@ class IndexinfoDialog(QtGui.QDialog):
         self.parent = parent
         self.setWindowTitle(parent.name)
 
+        self.connect_info = connect_info
         host, db_name, coll_name = connect_info
-        self.conn = pymongo.Connection(host)
+        self.conn = CONNECTIONS.acquire(host)
         self.coll = self.conn[db_name][coll_name]
 
         self.indexInfoLayout = QtGui.QVBoxLayout()
         self.index_checkbox = {}
+        self._building = set()
 
         self.exampleButton = QtGui.QPushButton("Example")
         self.exampleButton.clicked.connect(self.showExample)
@@ -983,9 +3469,26 @@ class IndexinfoDialog(QtGui.QDialog):
         newIndexLayout.addWidget(self.indexLineEdit)
         newIndexLayout.addWidget(applyButton)
 
+        self.backgroundCheckbox = QtGui.QCheckBox("Background build")
+        self.backgroundCheckbox.setChecked(True)
+        newIndexLayout.addWidget(self.backgroundCheckbox)
+
+        self.adviseButton = QtGui.QPushButton("Advise")
+        self.adviseButton.clicked.connect(self.advise)
+        self.profileCheckbox = QtGui.QCheckBox("Use profiler data")
+        self.adviceViewer = QtGui.QTextBrowser()
+        self.adviceViewer.hide()
+
+        adviseLayout = QtGui.QHBoxLayout()
+        adviseLayout.addWidget(self.adviseButton)
+        adviseLayout.addWidget(self.profileCheckbox)
+        adviseLayout.addStretch()
+
         mainLayout = QtGui.QVBoxLayout()
         mainLayout.addLayout(self.indexInfoLayout)
         mainLayout.addLayout(newIndexLayout)
+        mainLayout.addLayout(adviseLayout)
+        mainLayout.addWidget(self.adviceViewer)
 
         self.setLayout(mainLayout)
 
@@ -1007,10 +3510,29 @@ class IndexinfoDialog(QtGui.QDialog):
         if not index_exp.startswith('['):
             index_exp = '[%s]' % index_exp
         try:
-            new_indexes = eval(index_exp)
-            self.coll.ensure_index(new_indexes)
-        except:
-            pass
+            keys = [(key, 1) if isinstance(key, basestring) else tuple(key)
+                    for key in eval(index_exp)]
+            name = index_name(keys)
+        except Exception as e:
+            QtGui.QMessageBox.warning(self, 'Invalid index',
+                                      '%s\n%s' % (index_exp, e))
+            return
+
+        host, db_name, coll_name = self.connect_info
+        background = self.backgroundCheckbox.isChecked()
+        task = BackgroundTask('index %s' % name,
+                              lambda task: build_index(task, host, db_name,
+                                                       coll_name, keys, name,
+                                                       background))
+        self._building.add(name)
+        task.done.connect(lambda ok, result: self.indexBuilt(name, ok,
+                                                             result))
+        TaskDialog(self, task, "Building index %s" % name, 'docs').show()
+        task.start()
+
+    def indexBuilt(self, name, ok, result):
+        self._building.discard(name)
+        self.parent.parent.invalidate_namespaces(self.coll.database.name)
 
     def removeIndex(self, name, checked):
         if checked:
@@ -1035,19 +3557,101 @@ class IndexinfoDialog(QtGui.QDialog):
         self.coll.drop_index(name)
 
     def updateIndexInfo(self):
-        index_info = self.coll.index_information()
-        for name in index_info.keys():
-            if name == '_id_' or name in self.index_checkbox:
+        coll = self.coll
+        def job():
+            builds = []
+            try:
+                inprog = coll.database.current_op().get('inprog', [])
+                builds = index_builds(inprog, coll.full_name)
+            except:
+                pass
+            return coll.index_information(), builds
+        self.parent.parent.run_job(('index_info', self), job,
+                                   self.showIndexInfo)
+
+    def showIndexInfo(self, result):
+        index_info, builds = result
+        pending = dict((name, None) for name in self._building)
+        for op in builds:
+            for name in op['names']:
+                pending[name] = op
+
+        for name in set(index_info) | set(pending):
+            if name == '_id_':
                 continue
-            cb = QtGui.QCheckBox(name)
-            cb.setChecked(True)
-            cb.toggled.connect(CheckboxCallback(self.removeIndex,
-                                                name))
-            self.index_checkbox[name] = cb
-            self.indexInfoLayout.addWidget(cb)
+            cb = self.index_checkbox.get(name)
+            if cb is None:
+                cb = QtGui.QCheckBox(name)
+                cb.setChecked(True)
+                cb.toggled.connect(CheckboxCallback(self.removeIndex,
+                                                    name))
+                self.index_checkbox[name] = cb
+                self.indexInfoLayout.addWidget(cb)
+
+            if not name in pending:
+                cb.setText(name)
+                cb.setEnabled(True)
+                continue
+            op = pending[name]
+            if op is not None and op['total']:
+                cb.setText('%s (building %d%%)' %
+                           (name, 100 * op['done'] / op['total']))
+            else:
+                cb.setText('%s (building)' % name)
+            cb.setEnabled(False)
+
+        for name in self.index_checkbox.keys():
+            if name in index_info or name in pending:
+                continue
+            cb = self.index_checkbox.pop(name)
+            cb.hide()
+            self.indexInfoLayout.removeWidget(cb)
+
+    def _used_queries(self):
+        settings = self.parent.settings
+        sort = [('_id', pymongo.DESCENDING)]
+        history = settings.value('orderBy', None)
+        if history is not None:
+            order = pymongo.ASCENDING
+            if history[1] == 'DescendingOrder':
+                order = pymongo.DESCENDING
+            sort = [(history[0], order)]
+
+        queries = []
+        for exp in get_history(settings, 'filter'):
+            criteria = eval_filter(exp)
+            if criteria is not None:
+                queries.append((exp or '{}', criteria, sort))
+        return queries
+
+    def advise(self):
+        coll = self.coll
+        queries = self._used_queries()
+        use_profiler = self.profileCheckbox.isChecked()
+        def job():
+            used = list(queries)
+            if use_profiler:
+                profile = coll.database['system.profile']
+                cursor = profile.find({'ns': coll.full_name})
+                cursor = cursor.sort('ts', pymongo.DESCENDING).limit(1000)
+                for entry in cursor:
+                    query = profile_query(entry)
+                    if query is not None:
+                        used.append(('profiled %s' % json.dumps(
+                            query_shape(query[0]), sort_keys=True),)
+                                    + query)
+            return advise_indexes(used, coll.index_information())
+        self.parent.parent.run_job(('advisor', self), job, self.showAdvice)
+
+    def showAdvice(self, advice):
+        self.adviceViewer.setPlainText(advice)
+        self.adviceViewer.show()
 
     def closeEvent(self, e):
         self.timer.stop()
+        if self.conn is not None:
+            CONNECTIONS.release(self.conn)
+            self.conn = None
         e.accept()
 
     def showExample(self):
@@ -1064,6 +3668,363 @@ create a compound index on 'ready_time' and 'finish_time'
                                       example)
         
 
+class TaskDialog(QtGui.QDialog):
+    def __init__(self, parent, task, title, unit):
+        super(TaskDialog, self).__init__(parent)
+
+        self.task = task
+        self.unit = unit
+        self.setWindowTitle(title)
+
+        self.progressBar = QtGui.QProgressBar()
+        self.progressBar.setRange(0, 0)
+        self.progressLabel = QtGui.QLabel()
+        self.cancelButton = QtGui.QPushButton("Cancel")
+        self.cancelButton.clicked.connect(self.cancel)
+
+        buttonLayout = QtGui.QHBoxLayout()
+        buttonLayout.addStretch()
+        buttonLayout.addWidget(self.cancelButton)
+
+        mainLayout = QtGui.QVBoxLayout()
+        mainLayout.addWidget(self.progressBar)
+        mainLayout.addWidget(self.progressLabel)
+        mainLayout.addLayout(buttonLayout)
+        self.setLayout(mainLayout)
+
+        self.resize(400, 50)
+
+        task.setParent(self)
+        task.progress.connect(self.showProgress)
+        task.done.connect(self.finished)
+
+    def showProgress(self, progress):
+        done, total, text = progress
+        if total:
+            self.progressBar.setRange(0, total)
+            self.progressBar.setValue(min(done, total))
+        elapsed = time.time() - self.task.started
+        rate = done / elapsed if elapsed > 0 else 0
+        label = '%d %s, %.0f %s/s' % (done, self.unit, rate, self.unit)
+        if text:
+            label += '\n%s' % text
+        self.progressLabel.setText(label)
+
+    def finished(self, ok, result):
+        self.progressBar.setRange(0, 1)
+        self.progressBar.setValue(1 if ok else 0)
+        elapsed = time.time() - self.task.started
+        if ok:
+            text = 'Finished in %.1f s' % elapsed
+            if result is not None:
+                text += ': %s' % (result,)
+        elif result is None:
+            text = 'Cancelled after %.1f s' % elapsed
+        else:
+            text = 'Failed: %s' % (result,)
+        self.progressLabel.setText(text)
+        self.cancelButton.setText("Close")
+        self.cancelButton.setEnabled(True)
+
+    def cancel(self):
+        if not self.task.running:
+            self.close()
+            return
+        self.task.cancel()
+        self.cancelButton.setEnabled(False)
+        self.progressLabel.setText('Cancelling...')
+
+class ProfilerDialog(QtGui.QDialog):
+    def __init__(self, parent, db):
+        super(ProfilerDialog, self).__init__(parent)
+
+        self.parent = parent
+        self.db = db
+        self.setWindowTitle("Profiler - %s" % db.name)
+
+        self.levelComboBox = QtGui.QComboBox()
+        self.levelComboBox.addItems(['0 - off', '1 - slow operations',
+                                     '2 - all operations'])
+        self.slowmsSpinBox = QtGui.QSpinBox()
+        self.slowmsSpinBox.setRange(0, 3600000)
+        self.slowmsSpinBox.setSuffix(' ms')
+        self.levelLabel = QtGui.QLabel()
+        applyButton = QtGui.QPushButton("Apply")
+        applyButton.clicked.connect(self.set_level)
+
+        levelLayout = QtGui.QHBoxLayout()
+        levelLayout.addWidget(QtGui.QLabel("Level:"))
+        levelLayout.addWidget(self.levelComboBox)
+        levelLayout.addWidget(QtGui.QLabel("Slow:"))
+        levelLayout.addWidget(self.slowmsSpinBox)
+        levelLayout.addWidget(applyButton)
+        levelLayout.addWidget(self.levelLabel)
+        levelLayout.addStretch()
+
+        self.shapeTree = QtGui.QTreeWidget()
+        self.shapeTree.setRootIsDecorated(False)
+        self.shapeTree.setSortingEnabled(True)
+        self.shapeTree.setHeaderLabels(['Namespace', 'Op', 'Query shape',
+                                        'Count', 'Total ms', 'p95 ms',
+                                        'Docs examined'])
+        self.shapeTree.sortByColumn(4, QtCore.Qt.DescendingOrder)
+
+        mainLayout = QtGui.QVBoxLayout()
+        mainLayout.addLayout(levelLayout)
+        mainLayout.addWidget(self.shapeTree)
+        self.setLayout(mainLayout)
+
+        self.resize(900, 500)
+
+        self.stats = ProfileStats()
+        self._items = {}
+        self._hwm = None
+        self._at_hwm = set()
+        self.batch_size = 1000
+
+        self.get_level()
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.timeout.connect(self.tail)
+        self.timer.setInterval(2000)
+        self.timer.start()
+        self.tail()
+
+    def get_level(self):
+        db = self.db
+        job = lambda: db.command('profile', -1)
+        self.parent.run_job(('profile_level', self), job, self.show_level)
+
+    def show_level(self, result):
+        level = int(result.get('was', 0))
+        self.levelComboBox.setCurrentIndex(level)
+        self.slowmsSpinBox.setValue(int(result.get('slowms', 100)))
+        self.levelLabel.setText('current: %s, slow: %s ms' % (
+            level, result.get('slowms')))
+
+    def set_level(self):
+        db = self.db
+        level = self.levelComboBox.currentIndex()
+        slowms = self.slowmsSpinBox.value()
+        def job():
+            db.command('profile', level, slowms=slowms)
+            return db.command('profile', -1)
+        self.parent.run_job(('profile_level', self), job, self.show_level)
+
+    def tail(self):
+        profile = self.db['system.profile']
+        hwm = self._hwm
+        batch_size = self.batch_size
+        def job():
+            if hwm is None:
+                cursor = profile.find().sort('ts', pymongo.DESCENDING)
+                entries = list(cursor.limit(batch_size))
+                entries.reverse()
+                return entries
+            cursor = profile.find({'ts': {'$gte': hwm}})
+            return list(cursor.sort('ts', pymongo.ASCENDING).limit(batch_size))
+        self.parent.run_job(('profile_tail', self), job, self.add_entries)
+
+    def add_entries(self, entries):
+        changed = set()
+        for entry in entries:
+            ts = entry.get('ts')
+            fingerprint = doc_fingerprint(entry)
+            if ts == self._hwm and fingerprint in self._at_hwm:
+                continue
+            if self._hwm is None or ts > self._hwm:
+                self._hwm = ts
+                self._at_hwm = set()
+            self._at_hwm.add(fingerprint)
+            changed.add(self.stats.add(entry))
+
+        if len(changed) == 0:
+            return
+
+        self.shapeTree.setSortingEnabled(False)
+        for key in changed:
+            item = self._items.get(key)
+            if item is None:
+                item = self._items[key] = QtGui.QTreeWidgetItem()
+                self.shapeTree.addTopLevelItem(item)
+            for column, value in enumerate(self.stats.row(key)):
+                item.setData(column, QtCore.Qt.DisplayRole, value)
+        self.shapeTree.setSortingEnabled(True)
+
+    def closeEvent(self, e):
+        self.timer.stop()
+        e.accept()
+
+    def showEvent(self, e):
+        self.timer.start()
+
+class Sparkline(QtGui.QWidget):
+    def __init__(self, buf, parent=None):
+        super(Sparkline, self).__init__(parent)
+        self.buf = buf
+        self.setMinimumSize(200, 24)
+
+    def paintEvent(self, event):
+        values = self.buf.values()
+        if len(values) < 2:
+            return
+        low = min(values)
+        high = max(values)
+        if high == low:
+            high = low + 1
+
+        width = self.width() - 1
+        height = self.height() - 1
+        step = float(width) / (self.buf.size - 1)
+        offset = width - step * (len(values) - 1)
+        points = [QtCore.QPointF(offset + index * step,
+                                 height - (v - low) * height / (high - low))
+                  for index, v in enumerate(values)]
+
+        painter = QtGui.QPainter(self)
+        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+        painter.setPen(QtGui.QPen(QtCore.Qt.darkBlue, 1))
+        painter.drawPolyline(points)
+        painter.end()
+
+class ServerStatusDialog(QtGui.QDialog):
+    def __init__(self, parent, host, conn, settings):
+        super(ServerStatusDialog, self).__init__(parent)
+
+        self.parent = parent
+        self.conn = conn
+        self.settings = settings
+        self.setWindowTitle("Server status - %s" % host)
+
+        size = settings.value('status_history', 600, int)
+        self.series = ServerStatusSeries(size)
+
+        self.intervalSpinBox = QtGui.QSpinBox()
+        self.intervalSpinBox.setRange(1, 3600)
+        self.intervalSpinBox.setSuffix(' s')
+        self.intervalSpinBox.setValue(settings.value('status_interval', 1,
+                                                     int))
+        self.intervalSpinBox.valueChanged.connect(self.intervalChanged)
+
+        intervalLayout = QtGui.QHBoxLayout()
+        intervalLayout.addWidget(QtGui.QLabel("Interval:"))
+        intervalLayout.addWidget(self.intervalSpinBox)
+        intervalLayout.addStretch()
+
+        metricLayout = QtGui.QGridLayout()
+        self._values = {}
+        self._sparklines = []
+        for row, (name, path, kind, scale) in enumerate(SERVER_METRICS):
+            value = QtGui.QLabel('-')
+            value.setAlignment(QtCore.Qt.AlignRight)
+            value.setMinimumWidth(80)
+            sparkline = Sparkline(self.series.series[name])
+            metricLayout.addWidget(QtGui.QLabel(name), row, 0)
+            metricLayout.addWidget(value, row, 1)
+            metricLayout.addWidget(sparkline, row, 2)
+            self._values[name] = value
+            self._sparklines.append(sparkline)
+        metricLayout.setColumnStretch(2, 1)
+
+        mainLayout = QtGui.QVBoxLayout()
+        mainLayout.addLayout(intervalLayout)
+        mainLayout.addLayout(metricLayout)
+        self.setLayout(mainLayout)
+
+        self.resize(600, 450)
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.timeout.connect(self.poll)
+        self.timer.setInterval(self.intervalSpinBox.value() * 1000)
+        self.timer.start()
+        self.poll()
+
+    def intervalChanged(self, value):
+        self.timer.setInterval(value * 1000)
+        self.settings.setValue('status_interval', value)
+        self.settings.sync()
+
+    def poll(self):
+        conn = self.conn
+        job = lambda: conn.admin.command('serverStatus')
+        self.parent.run_job(('server_status', self), job, self.add_status)
+
+    def add_status(self, status):
+        self.series.add(status, time.time())
+        for name, label in self._values.items():
+            value = self.series.series[name].last()
+            if value is not None:
+                label.setText('%.1f' % value)
+        for sparkline in self._sparklines:
+            sparkline.update()
+
+    def closeEvent(self, e):
+        self.timer.stop()
+        e.accept()
+
+    def showEvent(self, e):
+        self.timer.start()
+
+class PollStatsDialog(QtGui.QDialog):
+    def __init__(self, parent):
+        super(PollStatsDialog, self).__init__(parent)
+
+        self.parent = parent
+        self.setWindowTitle("Polling statistics")
+
+        self.statsTree = QtGui.QTreeWidget()
+        self.statsTree.setHeaderLabels(['Stage', 'Count', 'p50 ms',
+                                        'p95 ms', 'Max ms'])
+
+        dumpButton = QtGui.QPushButton("Dump JSON")
+        dumpButton.clicked.connect(self.dump)
+
+        buttonLayout = QtGui.QHBoxLayout()
+        buttonLayout.addStretch()
+        buttonLayout.addWidget(dumpButton)
+
+        mainLayout = QtGui.QVBoxLayout()
+        mainLayout.addWidget(self.statsTree)
+        mainLayout.addLayout(buttonLayout)
+        self.setLayout(mainLayout)
+
+        self.resize(600, 400)
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.timeout.connect(self.updateStats)
+        self.timer.setInterval(1000)
+        self.timer.start()
+        self.updateStats()
+
+    def updateStats(self):
+        self.statsTree.clear()
+        for label, summary in sorted(self.parent.poll_stats().items()):
+            item = QtGui.QTreeWidgetItem([label])
+            for stage, s in sorted(summary.items()):
+                QtGui.QTreeWidgetItem(item, [stage, str(s['count']),
+                                             '%.1f' % s['p50'],
+                                             '%.1f' % s['p95'],
+                                             '%.1f' % s['max']])
+            self.statsTree.addTopLevelItem(item)
+            item.setExpanded(True)
+
+    def dump(self):
+        path, _ = QtGui.QFileDialog.getSaveFileName(self, "Dump statistics",
+                                                    "poll_stats.json",
+                                                    "JSON (*.json)")
+        if not path:
+            return
+        with open(path, 'w') as f:
+            json.dump(self.parent.poll_stats(), f, indent=2, sort_keys=True)
+
+    def closeEvent(self, e):
+        self.timer.stop()
+        e.accept()
+
+    def showEvent(self, e):
+        self.timer.start()
+        self.updateStats()
+
 class ColumnSelectDialog(QtGui.QDialog):
     def __init__(self, parent, column_actions):
         super(ColumnSelectDialog, self).__init__(parent)
@@ -1133,11 +4094,9 @@ class CollectionFilterDialog(QtGui.QDialog):
         self.exampleButton = QtGui.QPushButton("Example")
         self.exampleButton.clicked.connect(self.showExample)
 
-        global GLOBAL_PAUSE
-        self.g_pause = GLOBAL_PAUSE
         self.pauseCheckbox = QtGui.QCheckBox("Pause")
-        self.pauseCheckbox.setChecked(self.g_pause.isChecked())
-        self.pauseCheckbox.toggled.connect(lambda x: self.g_pause.setChecked(x))
+        self.pauseCheckbox.setChecked(parent.pauseAction.isChecked())
+        self.pauseCheckbox.toggled.connect(parent.pauseAction.setChecked)
 
         self.filterLineEdit = createComboBox('filter', self.settings, "")
         self._filter = parent._filter_exp
@@ -1149,6 +4108,11 @@ class CollectionFilterDialog(QtGui.QDialog):
         self.applyButton = QtGui.QPushButton("Apply")
         self.applyButton.clicked.connect(self.apply_filter)
 
+        self.explainButton = QtGui.QPushButton("Explain")
+        self.explainButton.clicked.connect(parent.requestExplain)
+        self.explainViewer = QtGui.QTextBrowser()
+        self.explainViewer.hide()
+
         self._filterTitle = QtGui.QLabel("Current Filter: ")
         self._currentFilter = QtGui.QLabel('"%s"' % self._filter)
 
@@ -1163,14 +4127,19 @@ class CollectionFilterDialog(QtGui.QDialog):
         filterLayout.addWidget(self.filterLineEdit)
         filterLayout.addWidget(self.applyButton)
         filterLayout.addWidget(self.pauseCheckbox)
+        filterLayout.addWidget(self.explainButton)
         filterLayout.addWidget(self.exampleButton)
 
         mainLayout = QtGui.QVBoxLayout()
         mainLayout.addLayout(topLayout)
         mainLayout.addLayout(filterLayout)
+        mainLayout.addWidget(self.explainViewer)
 
         self.setLayout(mainLayout)
 
+        if parent._explain is not None:
+            self.showExplain(parent._explain)
+
         self.resize(750, 50)
 
     def showExample(self):
@@ -1185,6 +4154,10 @@ empty string means no filtering"""
                                       "filter example",
                                       example)
 
+    def showExplain(self, summary):
+        self.explainViewer.setPlainText(format_explain(summary))
+        self.explainViewer.show()
+
     def filterChanged(self):
         if self.filterLineEdit.currentText() != self._filter:
             self.applyButton.setEnabled(True)
@@ -1207,6 +4180,8 @@ empty string means no filtering"""
         self.pauseCheckbox.setChecked(False)
 
 if __name__ == '__main__':
+    # the import pool re-runs this module in the frozen windows build
+    multiprocessing.freeze_support()
     setup_logging()
     app = QtGui.QApplication(sys.argv)
     tabdialog = TabDialog()
@@ -0,0 +1,587 @@
+# -*- coding: utf-8 -*-
+
+import os, re, shutil, tempfile, threading, unittest
+import json
+
+import pymongo
+import gui
+
+def lazy(**doc):
+    return gui.LazyDoc(dict((unicode(k), v) for k, v in doc.items()))
+
+class DocDiffTest(unittest.TestCase):
+    def commit(self, differ, docs, scope=None):
+        changes = differ.diff(docs, scope)
+        differ.commit(changes[4])
+        return changes
+
+    def test_new_modify_same_delete(self):
+        differ = gui.DocDiff()
+        self.commit(differ, [{'_id': 1, 'a': 1}, {'_id': 2, 'a': 2},
+                             {'_id': 3, 'a': 3}])
+        new, modify, same, delete, state = self.commit(
+            differ, [{'_id': 4, 'a': 4}, {'_id': 1, 'a': 10},
+                     {'_id': 2, 'a': 2}])
+        self.assertEqual([d['_id'] for d in new], [4])
+        self.assertEqual([(n['a'], o['a']) for n, o in modify], [(10, 1)])
+        self.assertEqual([d['_id'] for d in same], [2])
+        self.assertEqual([d['_id'] for d in delete], [3])
+
+    def test_unhashable_ids(self):
+        differ = gui.DocDiff()
+        self.commit(differ, [{'_id': {'a': [1]}, 'b': 1}])
+        new, modify, same, delete, state = self.commit(
+            differ, [{'_id': {'a': [1]}, 'b': 2}])
+        self.assertEqual((len(new), len(modify), len(delete)), (0, 1, 0))
+
+    def test_values_with_equal_hashes_are_modified(self):
+        for old, new in ((-1, -2), (1, True), (1, 1.0), ([], {})):
+            differ = gui.DocDiff()
+            self.commit(differ, [{'_id': 1, 'a': old}])
+            modify = self.commit(differ, [{'_id': 1, 'a': new}])[1]
+            self.assertEqual(len(modify), 1, (old, new))
+
+    def test_scope_limits_deletes(self):
+        differ = gui.DocDiff()
+        self.commit(differ, [{'_id': 1}, {'_id': 2}, {'_id': 3}])
+        changes = self.commit(differ, [{'_id': 2}], scope=[1, 2])
+        self.assertEqual([d['_id'] for d in changes[3]], [1])
+        self.assertEqual(len(differ), 2)
+
+    def test_diff_does_not_change_state_before_commit(self):
+        differ = gui.DocDiff()
+        differ.diff([{'_id': 1}])
+        self.assertEqual(len(differ), 0)
+
+    def test_known_follows_commits(self):
+        differ = gui.DocDiff()
+        self.commit(differ, [{'_id': 1}, {'_id': 2}])
+        self.commit(differ, [{'_id': 3}, {'_id': 2}], scope=[2])
+        self.assertEqual(sorted(differ.known()), [1, 2, 3])
+
+    def test_trim_scope_keeps_newest(self):
+        differ = gui.DocDiff()
+        self.commit(differ, [{'_id': i, 't': i * 10} for i in (3, 2, 1)])
+        docs = [{'_id': 5, 't': 50}, {'_id': 4, 't': 40}]
+        self.assertEqual(gui.trim_scope(differ, docs, 't', 3), [2, 1])
+        self.assertEqual(gui.trim_scope(differ, [], 't', 3), [])
+        self.assertEqual(gui.high_water_mark(docs, 't', 30), 50)
+
+class DetailTest(unittest.TestCase):
+    def test_changed_paths(self):
+        new = {'a': 1, 'b': {'c': 1, 'd': 2}, 'e': 3}
+        old = {'a': 1, 'b': {'c': 2, 'd': 2}, 'f': 1}
+        self.assertEqual(gui.changed_paths(new, old),
+                         set([('b', 'c'), ('e',)]))
+        self.assertEqual(gui.changed_paths(new, new), set())
+
+    def test_doc_lines(self):
+        self.assertEqual(gui.doc_lines({'b': {'c': 1}}),
+                         [((), '{\n'),
+                          (('b',), '    "b": {\n'),
+                          (('b', 'c'), '        "c": "1",\n'),
+                          (('b',), '    }\n'),
+                          ((), '}\n')])
+
+class LazyDocTest(unittest.TestCase):
+    def test_converts_lists_and_nested_documents(self):
+        doc = gui.LazyDoc({u'_id': 1, u'名': [u'値', {u'k': u'v'}]})
+        self.assertEqual(doc['名'], ['値', {'k': 'v'}])
+        self.assertTrue(isinstance(doc['名'][0], str))
+        self.assertEqual(doc.get('missing', 0), 0)
+
+    def test_fingerprint_follows_content(self):
+        self.assertEqual(lazy(_id=1, a=[1]).fingerprint,
+                         lazy(_id=1, a=[1]).fingerprint)
+        self.assertNotEqual(lazy(_id=1, a=[1]).fingerprint,
+                            lazy(_id=1, a=[2]).fingerprint)
+        self.assertNotEqual(lazy(_id=1, a=-1).fingerprint,
+                            lazy(_id=1, a=-2).fingerprint)
+
+class KeysetTest(unittest.TestCase):
+    def test_id(self):
+        doc = {'_id': 5}
+        self.assertEqual(gui.keyset_criteria(doc, '_id', pymongo.DESCENDING),
+                         {'_id': {'$lt': 5}})
+        self.assertEqual(gui.keyset_criteria(doc, '_id', pymongo.ASCENDING),
+                         {'_id': {'$gt': 5}})
+        self.assertEqual(gui.keyset_criteria(doc, '_id', pymongo.DESCENDING,
+                                             after=False),
+                         {'_id': {'$gt': 5}})
+
+    def test_other_column_breaks_ties_on_id(self):
+        doc = {'_id': 5, 'a': 1}
+        self.assertEqual(gui.keyset_criteria(doc, 'a', pymongo.ASCENDING),
+                         {'$or': [{'a': {'$gt': 1}},
+                                  {'a': 1, '_id': {'$gt': 5}}]})
+
+class PollScheduleTest(unittest.TestCase):
+    def test_backs_off_when_idle(self):
+        schedule = gui.PollSchedule(min_interval=1, max_interval=4,
+                                    backoff=2, idle_polls=2)
+        self.assertTrue(schedule.due(0))
+        intervals = []
+        for now in (0, 1, 3, 7):
+            schedule.record(False, now)
+            intervals.append(schedule.interval)
+        self.assertEqual(intervals, [1, 2, 4, 4])
+        self.assertFalse(schedule.due(10))
+        self.assertTrue(schedule.due(11))
+
+    def test_change_resets_interval(self):
+        schedule = gui.PollSchedule(min_interval=1, idle_polls=1)
+        schedule.record(False, 0)
+        schedule.record(False, 2)
+        schedule.record(True, 6)
+        self.assertEqual(schedule.interval, 1)
+        self.assertTrue(schedule.due(7))
+        schedule.record(False, 7)
+        schedule.reset()
+        self.assertTrue(schedule.due(0))
+
+class FakeDatabase(object):
+    def __init__(self, result=None):
+        self.result = result
+
+    def command(self, name, **options):
+        if self.result is None:
+            raise pymongo.errors.OperationFailure('no such command')
+        return self.result
+
+    def collection_names(self):
+        return ['fallback']
+
+class NamespaceTest(unittest.TestCase):
+    def test_collection_names_only(self):
+        db = FakeDatabase({'cursor': {'id': 0, 'firstBatch': [
+            {'name': 'a', 'type': 'collection'}, {'name': 'b'}]}})
+        self.assertEqual(gui.list_collection_names(db), ['a', 'b'])
+
+    def test_collection_names_fallback(self):
+        self.assertEqual(gui.list_collection_names(FakeDatabase()),
+                         ['fallback'])
+        db = FakeDatabase({'cursor': {'id': 5, 'firstBatch': []}})
+        self.assertEqual(gui.list_collection_names(db), ['fallback'])
+
+class FakeClient(object):
+    def __init__(self, host, **options):
+        self.host = host
+        self.options = options
+        self.disconnected = 0
+
+    def __getitem__(self, name):
+        return self
+
+    def disconnect(self):
+        self.disconnected += 1
+
+class ConnectionRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.connection = pymongo.__dict__.get('Connection')
+        pymongo.Connection = FakeClient
+
+    def tearDown(self):
+        if self.connection is None:
+            del pymongo.Connection
+        else:
+            pymongo.Connection = self.connection
+
+    def test_clients_are_shared_per_host_and_options(self):
+        registry = gui.ConnectionRegistry()
+        first = registry.acquire('h:1')
+        self.assertTrue(registry.acquire('h:1') is first)
+        self.assertFalse(registry.acquire('h:1', w=1) is first)
+        self.assertFalse(registry.acquire('h:2') is first)
+        self.assertEqual((registry.opened, registry.reused), (3, 1))
+
+    def test_last_release_disconnects(self):
+        registry = gui.ConnectionRegistry()
+        client = registry.acquire('h:1')
+        registry.acquire('h:1')
+        registry.release(client)
+        self.assertEqual(client.disconnected, 0)
+        registry.release(client)
+        self.assertEqual(client.disconnected, 1)
+        self.assertEqual(registry.summary(), [])
+        self.assertFalse(registry.acquire('h:1') is client)
+
+    def test_collection_task_holds_a_reference(self):
+        refs = []
+        def func(task, coll):
+            refs.append(gui.CONNECTIONS.summary())
+            raise ValueError()
+        run = gui.collection_task('h:1', 'db', 'c', func)
+        self.assertRaises(ValueError, run, None)
+        self.assertEqual(refs, [[('h:1', 1, None)]])
+        self.assertEqual(gui.CONNECTIONS.summary(), [])
+
+class RollingStatsTest(unittest.TestCase):
+    def test_percentiles_in_milliseconds(self):
+        stats = gui.RollingStats()
+        for ms in xrange(100, 0, -1):
+            stats.add_all({'find': ms / 1000.0})
+        summary = stats.summary()['find']
+        self.assertEqual(summary['count'], 100)
+        self.assertAlmostEqual(summary['p50'], 51)
+        self.assertAlmostEqual(summary['p95'], 96)
+        self.assertAlmostEqual(summary['max'], 100)
+
+    def test_keeps_last_samples(self):
+        stats = gui.RollingStats(size=3)
+        for seconds in (9, 1, 2, 3):
+            stats.add('diff', seconds)
+        self.assertEqual(stats.summary()['diff']['max'], 3000)
+
+class AdvisorTest(unittest.TestCase):
+    def test_query_fields(self):
+        self.assertEqual(gui.query_fields({'a': 1, 'b': {'$in': [1]},
+                                           'c': {'$gt': 1},
+                                           'd': re.compile('x')}),
+                         (['a', 'b'], ['c', 'd']))
+        self.assertEqual(gui.query_fields({'$and': [{'a': 1},
+                                                    {'a': {'$lt': 2}}]}),
+                         (['a'], []))
+        self.assertEqual(gui.query_fields({'$or': [{'a': 1}]}), None)
+
+    def test_esr_index(self):
+        self.assertEqual(gui.esr_index(['a'], [('s', -1)], ['r']),
+                         [('a', 1), ('s', -1), ('r', 1)])
+
+    def test_index_support(self):
+        keys = [('a', 1), ('s', -1), ('r', 1)]
+        self.assertEqual(gui.index_support(keys, ['a'], [('s', -1)], ['r']),
+                         'esr')
+        self.assertEqual(gui.index_support(keys, ['a'], [('s', 1)], ['r']),
+                         'esr')
+        self.assertEqual(gui.index_support(keys, ['a'], [], ['x']),
+                         'partial')
+        self.assertEqual(gui.index_support(keys, ['x'], [], []), None)
+
+    def test_redundant_indexes(self):
+        info = {'_id_': {'key': [('_id', 1)]},
+                'a_1': {'key': [('a', 1)]},
+                'a_-1': {'key': [('a', -1)]},
+                'a_1_b_1': {'key': [('a', 1), ('b', 1)]},
+                'u': {'key': [('b', 1)], 'unique': True}}
+        self.assertEqual(gui.redundant_indexes(info),
+                         [('a_-1', 'a_1_b_1'), ('a_1', 'a_-1')])
+
+class CancelledTask(object):
+    def cancelled(self):
+        return True
+
+    def report(self, *args, **kwargs):
+        pass
+
+class FakeIndexClient(object):
+    # the client, its databases and collections are all this object
+    full_name = 'db.c'
+
+    def __init__(self, inprog):
+        self.inprog = inprog
+        self.killed = []
+        self.database = self.admin = self
+        self._built = threading.Event()
+        if not any(op['opid'] == 8 for op in inprog):
+            self._built.set()
+
+    def __getitem__(self, name):
+        return self
+
+    def create_index(self, keys, name, background):
+        self._built.wait(5)
+        return name
+
+    def current_op(self):
+        return {'inprog': self.inprog}
+
+    def command(self, name, op):
+        self.killed.append(op)
+        self._built.set()
+
+    def disconnect(self):
+        pass
+
+class IndexBuildTest(unittest.TestCase):
+    def test_index_builds(self):
+        inprog = [{'opid': 1, 'ns': 'db.$cmd',
+                   'command': {'createIndexes': 'c',
+                               'indexes': [{'name': 'a_1'}]},
+                   'progress': {'done': 5, 'total': 10}},
+                  {'opid': 2, 'ns': 'db.$cmd',
+                   'command': {'createIndexes': 'other'}},
+                  {'opid': 3, 'ns': 'db.c', 'msg': 'Index Build (background)'},
+                  {'opid': 4, 'ns': 'db.c', 'command': {'find': 'c'}}]
+        builds = gui.index_builds(inprog, 'db.c')
+        self.assertEqual([(b['opid'], b['names'], b['done'], b['total'])
+                          for b in builds],
+                         [(1, ['a_1'], 5, 10), (3, [], None, None)])
+
+    def build(self, inprog):
+        self.client = client = FakeIndexClient(inprog)
+        connection = pymongo.__dict__.get('Connection')
+        pymongo.Connection = lambda host, **options: client
+        try:
+            result = gui.build_index(CancelledTask(), 'h:1', 'db', 'c',
+                                     [('a', 1)], 'a_1', True)
+        finally:
+            if connection is None:
+                del pymongo.Connection
+            else:
+                pymongo.Connection = connection
+        return result
+
+    def test_cancel_kills_only_the_named_build(self):
+        inprog = [{'opid': 7, 'ns': 'db.c', 'msg': 'Index Build'},
+                  {'opid': 8, 'ns': 'db.$cmd',
+                   'command': {'createIndexes': 'c',
+                               'indexes': [{'name': 'a_1'}]}}]
+        self.assertRaises(gui.TaskCancelled, self.build, inprog)
+        self.assertEqual(self.client.killed, [8])
+
+    def test_cancel_without_a_matching_op_is_reported(self):
+        inprog = [{'opid': 7, 'ns': 'db.c', 'msg': 'Index Build'}]
+        self.assertEqual(self.build(inprog),
+                         'a_1, the build could not be cancelled')
+        self.assertEqual(self.client.killed, [])
+
+class ExplainTest(unittest.TestCase):
+    def test_query_planner(self):
+        summary = gui.summarize_explain({
+            'queryPlanner': {'winningPlan': {
+                'stage': 'FETCH',
+                'inputStage': {'stage': 'IXSCAN', 'indexName': 'a_1'}}},
+            'executionStats': {'totalKeysExamined': 3,
+                               'totalDocsExamined': 3,
+                               'nReturned': 3, 'executionTimeMillis': 1}})
+        self.assertEqual(summary['index'], 'a_1')
+        self.assertFalse(summary['collscan'])
+
+    def test_legacy_cursor(self):
+        summary = gui.summarize_explain({'cursor': 'BasicCursor',
+                                         'nscanned': 10, 'n': 1})
+        self.assertTrue(summary['collscan'])
+        self.assertEqual(summary['index'], None)
+
+class ProfileTest(unittest.TestCase):
+    def test_shape_drops_values_and_volatile_keys(self):
+        entry = {'ns': 'db.c', 'op': 'query',
+                 'query': {'a': 5, 'b': {'$in': [1, 2]}, 'lsid': 1}}
+        self.assertEqual(gui.profile_shape(entry),
+                         ('db.c', 'query',
+                          json.dumps({'a': '?', 'b': {'$in': ['?']}},
+                                     sort_keys=True)))
+
+    def test_command_shape(self):
+        entry = {'ns': 'db.c', 'op': 'command',
+                 'command': {'find': 'c', 'filter': {'x': 1}, '$db': 'db'}}
+        self.assertEqual(gui.profile_shape(entry)[2],
+                         json.dumps({'find': '?', 'filter': {'x': '?'}},
+                                    sort_keys=True))
+
+    def test_stats_per_shape(self):
+        stats = gui.ProfileStats()
+        key = stats.add({'ns': 'db.c', 'op': 'query', 'query': {'a': 1},
+                         'millis': 10, 'docsExamined': 5})
+        self.assertEqual(stats.add({'ns': 'db.c', 'op': 'query',
+                                    'query': {'a': 2}, 'millis': 30,
+                                    'docsExamined': 5}), key)
+        self.assertEqual(stats.row(key), key + (2, 40, 30, 10))
+
+def bson_type(value):
+    if isinstance(value, (int, long, float)):
+        return 'number'
+    if isinstance(value, basestring):
+        return 'string'
+    return type(value)
+
+def compare(value, op, arg):
+    # like the server, ranges only match values of the same bson type
+    if op == '$in':
+        return value in arg
+    if bson_type(value) != bson_type(arg):
+        return False
+    return {'$gt': value > arg, '$gte': value >= arg,
+            '$lt': value < arg, '$lte': value <= arg}[op]
+
+def matches(doc, query):
+    for key, cond in query.items():
+        if key == '$and':
+            if not all(matches(doc, sub) for sub in cond):
+                return False
+        elif isinstance(cond, dict):
+            if not key in doc or not all(compare(doc[key], op, arg)
+                                         for op, arg in cond.items()):
+                return False
+        elif doc.get(key) != cond:
+            return False
+    return True
+
+class FakeCursor(object):
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, order):
+        self.docs.sort(key=lambda doc: doc[key],
+                       reverse=order == pymongo.DESCENDING)
+        return self
+
+    def limit(self, size):
+        return iter(self.docs[:size])
+
+    def count(self):
+        return len(self.docs)
+
+class FakeCollection(object):
+    name = 'c'
+
+    def __init__(self, docs, options=None, indexes=None):
+        self.docs = docs
+        self.database = self
+        self._options = options or {}
+        self.indexes = indexes or {}
+        self.calls = []
+
+    def find(self, query, projection=None):
+        return FakeCursor([doc for doc in self.docs if matches(doc, query)])
+
+    def remove(self, query):
+        kept = [doc for doc in self.docs if not matches(doc, query)]
+        removed = len(self.docs) - len(kept)
+        self.docs = kept
+        return {'n': removed}
+
+    def options(self):
+        return self._options
+
+    def index_information(self):
+        return self.indexes
+
+    def drop(self):
+        self.calls.append(('drop',))
+
+    def create_collection(self, name, **options):
+        self.calls.append(('create_collection', name, options))
+
+    def create_index(self, keys, name, **options):
+        self.calls.append(('create_index', keys, name, options))
+
+class FakeTask(object):
+    def __init__(self, checks=None):
+        self.checks = checks
+
+    def check(self):
+        if self.checks is not None:
+            if self.checks == 0:
+                raise gui.TaskCancelled()
+            self.checks -= 1
+
+    def report(self, *args, **kwargs):
+        pass
+
+class ClearTest(unittest.TestCase):
+    def test_filter_only_removes_matching_documents(self):
+        coll = FakeCollection([{'_id': i, 'k': i % 2} for i in xrange(10)])
+        removed = gui.delete_batches(FakeTask(), coll, {'k': 1}, 2, 0)
+        self.assertEqual(removed, 5)
+        self.assertEqual([doc['_id'] for doc in coll.docs], [0, 2, 4, 6, 8])
+
+    def test_batches_cross_id_types(self):
+        ids = [1, 2, 3, u'a', u'b', 4.5, None]
+        coll = FakeCollection([{'_id': _id} for _id in ids])
+        removed = gui.delete_batches(FakeTask(), coll, {}, 2, 0)
+        self.assertEqual((removed, coll.docs), (7, []))
+
+    def test_cancel_stops_between_batches(self):
+        coll = FakeCollection([{'_id': i} for i in xrange(10)])
+        self.assertRaises(gui.TaskCancelled, gui.delete_batches,
+                          FakeTask(checks=2), coll, {}, 3, 0)
+        self.assertEqual([doc['_id'] for doc in coll.docs], [6, 7, 8, 9])
+
+    def test_drop_and_recreate_keeps_options_and_indexes(self):
+        coll = FakeCollection([], {'capped': True, 'size': 4096}, {
+            '_id_': {'key': [('_id', 1)], 'v': 1},
+            'a_1': {'key': [('a', 1)], 'v': 1, 'ns': 'db.c',
+                    'unique': True}})
+        gui.drop_and_recreate(FakeTask(), coll)
+        self.assertEqual(coll.calls, [
+            ('drop',),
+            ('create_collection', 'c', {'capped': True, 'size': 4096}),
+            ('create_index', [('a', 1)], 'a_1', {'unique': True})])
+
+    def test_cancelled_drop_leaves_the_collection(self):
+        coll = FakeCollection([])
+        self.assertRaises(gui.TaskCancelled, gui.drop_and_recreate,
+                          FakeTask(checks=0), coll)
+        self.assertEqual(coll.calls, [])
+
+class ExportTest(unittest.TestCase):
+    def test_pages_reach_every_document(self):
+        docs = [{'_id': i, 'a': None if i % 3 else i} for i in xrange(250)]
+        pages = gui.export_pages(FakeTask(), FakeCollection(docs), {}, None,
+                                 size=100)
+        exported = [doc['_id'] for page in pages for doc in page]
+        self.assertEqual(exported, range(250))
+
+class ImportTest(unittest.TestCase):
+    def test_csv_doc(self):
+        self.assertEqual(gui.csv_doc([u'a', u'b.c', u's'], ['1', '2.5', 'x']),
+                         {u'a': 1, u'b': {u'c': 2.5}, u's': u'x'})
+
+    def test_parse_chunk_counts_bad_lines(self):
+        lines = ['{"a": 1}\n', '\n', 'nope\n', '[1, 2]\n',
+                 '{"_id": {"$oid": "zz"}}\n']
+        docs, errors = gui.parse_chunk(('json', None, lines))
+        self.assertEqual(docs, [{u'a': 1}])
+        self.assertEqual(errors, 3)
+
+class ServerStatusTest(unittest.TestCase):
+    def test_ring_buffer(self):
+        buf = gui.RingBuffer(3)
+        for value in xrange(5):
+            buf.append(value)
+        self.assertEqual(buf.values(), [2.0, 3.0, 4.0])
+        self.assertEqual(buf.last(), 4.0)
+
+    def test_rates_and_gauges(self):
+        series = gui.ServerStatusSeries(10)
+        series.add({'uptimeMillis': 1000, 'opcounters': {'insert': 10},
+                    'connections': {'current': 5}}, 0)
+        series.add({'uptimeMillis': 3000, 'opcounters': {'insert': 30},
+                    'connections': {'current': 6}}, 0)
+        # a restart resets the counters, that sample is skipped
+        series.add({'uptimeMillis': 4000, 'opcounters': {'insert': 1}}, 0)
+        self.assertEqual(series.series['insert/s'].values(), [10.0])
+        self.assertEqual(series.series['connections'].values(), [5.0, 6.0])
+
+class SettingsTest(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.ini = os.path.join(self.path, 'gui.ini')
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_history_changed_in_place_is_written(self):
+        store = gui.SettingsStore(self.ini)
+        view = gui.SettingsView(store, 'host-db-coll')
+        gui.save_history(view, 'columns', ['a', 'b'])
+        store.flush()
+        gui.update_history(view, 'columns', 'c', True)
+        store.flush()
+
+        view = gui.SettingsView(gui.SettingsStore(self.ini), 'host-db-coll')
+        self.assertEqual(view.value('columns', [], list), ['a', 'b', 'c'])
+
+    def test_typed_values(self):
+        view = gui.SettingsView(gui.SettingsStore(self.ini))
+        view.setValue('lazy', 'true')
+        view.setValue('interval', '12')
+        self.assertEqual(view.value('lazy', False, bool), True)
+        self.assertEqual(view.value('interval', 30.0, float), 12.0)
+        self.assertEqual(view.value('missing', 3, int), 3)
+        view.setValue('bad', 'x')
+        self.assertEqual(view.value('bad', 4, int), 4)
+
+if __name__ == '__main__':
+    unittest.main()